@@ -0,0 +1,315 @@
+# api.py
+
+"""
+只读 JSON 查询接口，作为独立进程与 app.py 部署在同一目录下，通过 dataset_cache 读取与看板相同的 zgyd/ 数据文件
+(进程内缓存各自独立，文件更新后同样自动失效)。下游工具不必再抓取看板页面或从 git 拉取完整的 zgyd/*.json 文件。
+
+接口 (仅 GET)：
+  /api/tasks     所有任务：任务键、数据集名称、最近抓取时间 (metadata.json) 和记录数
+  /api/records   查询一个任务的记录，参数：
+    task         任务键 (如 TASK_3) 或数据集名称，必填
+    unit         单位，可重复或逗号分隔 (如 unit=北京,上海)
+    start / end  发布日期范围 (YYYY-MM-DD，含两端)
+    id           记录 id，可重复或逗号分隔
+    fields       返回的字段，逗号分隔 (默认 DEFAULT_FIELDS)
+    page / size  分页 (从 1 开始，每页最多 MAX_PAGE_SIZE 条)
+    since        抓取时间 (metadata.json 格式，如上次响应中的 crawl_time)：只返回此后新增或变化的记录，
+                 并在 removed 中列出此后下线的 id；since 不早于最近抓取时间时直接返回 304。
+                 变化记录来自随仓库提交的快照增量文件 (爬虫设置 CRAWLER_DATASET_STORAGE=delta 时)，
+                 或本地的历史库 zgyd/history.db (不随仓库提交)；since 早于最近一次压缩、两者都不可用时
+                 返回完整结果并标明 delta 为 false
+
+条件请求：响应带 ETag (数据集文件版本 + 抓取时间 + 查询参数) 和 Last-Modified (抓取时间)，
+请求带 If-None-Match 且数据未变化时返回 304，不传输内容。
+
+用法：
+  python api.py --port 8502
+  curl 'http://127.0.0.1:8502/api/records?task=TASK_3&start=2025-10-01&fields=id,name,backDate'
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from task_registry import load_task_registry
+from dataset_cache import (
+    load_metadata, load_dataset, load_time_index, load_sort_order, load_changes_since,
+    file_signature, get_dataset_paths, STATISTICS_COLUMNS,
+)
+
+TASK_CONFIG = load_task_registry()
+
+# 可返回的字段 (数据集原始字段 + 详情链接) 及未指定 fields 时的默认字段
+QUERY_FIELDS = STATISTICS_COLUMNS + ['LINK']
+DEFAULT_FIELDS = ['id', 'companyTypeName', 'name', 'LINK', 'publishDate', 'tenderSaleDeadline', 'publicityEndTime', 'backDate']
+
+# 只给出 start 或 end 时另一端的取值
+OPEN_RANGE = (datetime(1900, 1, 1), datetime(2200, 1, 1))
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# metadata.json 中的抓取时间为北京时间
+CRAWL_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+CRAWL_TIME_TZ = timezone(timedelta(hours=8))
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def get_list_param(params, name):
+    """可重复或逗号分隔的参数，返回去掉空值的列表。"""
+    return [value.strip() for raw in params.get(name, []) for value in raw.split(',') if value.strip()]
+
+
+def get_param(params, name, default=None):
+    values = params.get(name)
+    return values[-1].strip() if values else default
+
+
+def parse_date_param(params, name):
+    value = get_param(params, name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ApiError(400, f"参数 {name} 应为 YYYY-MM-DD 格式: {value}")
+
+
+def parse_int_param(params, name, default, low, high):
+    value = get_param(params, name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"参数 {name} 应为整数: {value}")
+    if not low <= number <= high:
+        raise ApiError(400, f"参数 {name} 应在 {low} 到 {high} 之间: {value}")
+    return number
+
+
+def parse_since(params):
+    """since 统一为 metadata.json 的时间格式 (也接受只有日期的形式)，便于与历史库中的时间字符串比较。"""
+    value = get_param(params, 'since')
+    if not value:
+        return None
+    for time_format in (CRAWL_TIME_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, time_format).strftime(CRAWL_TIME_FORMAT)
+        except ValueError:
+            continue
+    raise ApiError(400, f"参数 since 应为 {CRAWL_TIME_FORMAT} 格式: {value}")
+
+
+def resolve_task(value):
+    """任务键或数据集名称 -> 任务键。"""
+    if not value:
+        raise ApiError(400, "缺少参数 task")
+    if value in TASK_CONFIG:
+        return value
+    for task_key, config in TASK_CONFIG.items():
+        if config["name"] == value:
+            return task_key
+    raise ApiError(404, f"未知任务: {value}")
+
+
+def build_etag(task_name, crawl_time, params):
+    """数据集文件版本 + 抓取时间 + 规范化的查询参数。"""
+    query = sorted((name, value) for name, values in params.items() for value in values)
+    key = json.dumps([file_signature(*get_dataset_paths(task_name)), crawl_time, query], ensure_ascii=False, default=str)
+    return '"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def to_http_date(crawl_time):
+    try:
+        moment = datetime.strptime(crawl_time, CRAWL_TIME_FORMAT).replace(tzinfo=CRAWL_TIME_TZ)
+    except (TypeError, ValueError):
+        return None
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+def select_rows(task_key, task_name, df, params, since):
+    """
+    按筛选条件返回行号 (按发布时间降序，缺失的排在最后) 以及 since 模式下的下线 id 列表。
+    日期范围由发布时间排序索引做区间查询，排序使用 dataset_cache 预先计算的行顺序。
+    """
+    units = get_list_param(params, 'unit')
+    ids = set(get_list_param(params, 'id'))
+    start, end = parse_date_param(params, 'start'), parse_date_param(params, 'end')
+    if start and end and start > end:
+        raise ApiError(400, "参数 start 不能晚于 end")
+
+    mask = np.ones(len(df), dtype=bool)
+    if start or end:
+        time_index = load_time_index(task_name)
+        mask[:] = False
+        if time_index is not None:
+            mask[time_index.rows_in(start or OPEN_RANGE[0], end + timedelta(days=1) if end else OPEN_RANGE[1], units)] = True
+    elif units:
+        mask = df['companyTypeName'].isin(units).to_numpy() if 'companyTypeName' in df.columns else np.zeros(len(df), dtype=bool)
+    if ids:
+        mask &= df['id'].isin(list(ids)).to_numpy()
+
+    removed = None
+    if since:
+        changes = load_changes_since(task_key, task_name, since)
+        if changes is not None:
+            changed_ids, removed = changes
+            mask &= df['id'].isin(changed_ids).to_numpy()
+            if ids:
+                removed = [record_id for record_id in removed if record_id in ids]
+
+    order = load_sort_order(task_name, 'PublishDateTime', descending=True)
+    if order is None:
+        order = np.arange(len(df))
+    return order[mask[order]], removed
+
+
+def query_records(params):
+    """返回 (ETag, 抓取时间, 响应 JSON)；数据未变化时响应 JSON 为 None (304)。"""
+    task_key = resolve_task(get_param(params, 'task'))
+    task_name = TASK_CONFIG[task_key]["name"]
+    crawl_time = load_metadata().get(task_name)
+    etag = build_etag(task_name, crawl_time, params)
+
+    since = parse_since(params)
+    fields = get_list_param(params, 'fields') or DEFAULT_FIELDS
+    unknown = [field for field in fields if field not in QUERY_FIELDS]
+    if unknown:
+        raise ApiError(400, f"未知字段: {', '.join(unknown)} (可用字段: {', '.join(QUERY_FIELDS)})")
+    page = parse_int_param(params, 'page', 1, 1, 10 ** 9)
+    size = parse_int_param(params, 'size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+
+    # 上次抓取之后没有新的抓取，since 之后不可能有变化
+    if since and crawl_time and since >= crawl_time:
+        return etag, crawl_time, None
+
+    df = load_dataset(task_name)
+    if df is None:
+        raise ApiError(404, f"数据集 {task_name} 不存在")
+    rows, removed = select_rows(task_key, task_name, df, params, since)
+
+    page_df = df.iloc[rows[(page - 1) * size: page * size]]
+    page_df = page_df[[field for field in fields if field in page_df.columns]]
+    # Parquet 中的时间列为时间戳类型，按原始 JSON 的字符串格式输出
+    page_df = page_df.assign(**{
+        column: page_df[column].dt.strftime(CRAWL_TIME_FORMAT)
+        for column in page_df.columns if pd.api.types.is_datetime64_any_dtype(page_df[column])
+    })
+    result = {
+        "task": task_key,
+        "name": task_name,
+        "crawl_time": crawl_time,
+        "total": int(len(rows)),
+        "page": page,
+        "size": size,
+        "pages": math.ceil(len(rows) / size),
+        "records": json.loads(page_df.to_json(orient='records', force_ascii=False)),
+    }
+    if since:
+        # 变化记录不可用时退回完整结果，由 delta 标明
+        result.update({"since": since, "delta": removed is not None, "removed": removed or []})
+    return etag, crawl_time, result
+
+
+def list_tasks():
+    metadata = load_metadata()
+    tasks = []
+    for task_key, config in TASK_CONFIG.items():
+        df = load_dataset(config["name"])
+        tasks.append({
+            "task": task_key,
+            "name": config["name"],
+            "crawl_time": metadata.get(config["name"]),
+            "records": 0 if df is None else len(df),
+            "schedule": config.get("schedule"),
+        })
+    return {"tasks": tasks}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "zgyd-api"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data, headers=()):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path.rstrip('/') == '/api/tasks':
+                self.send_json(200, list_tasks(), [('Cache-Control', 'no-cache')])
+            elif url.path.rstrip('/') == '/api/records':
+                etag, crawl_time, result = query_records(params)
+                headers = [('ETag', etag), ('Cache-Control', 'no-cache')]
+                last_modified = to_http_date(crawl_time)
+                if last_modified:
+                    headers.append(('Last-Modified', last_modified))
+                if result is None or etag_matches(self.headers.get('If-None-Match'), etag):
+                    self.send_response(304)
+                    for name, value in headers:
+                        self.send_header(name, value)
+                    self.end_headers()
+                else:
+                    self.send_json(200, result, headers)
+            else:
+                raise ApiError(404, f"未知接口: {url.path}")
+        except ApiError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            print(f"[-] 处理请求 {self.path} 失败: {e}")
+            self.send_json(500, {"error": "服务器内部错误"})
+
+
+def start_server(host="127.0.0.1", port=0):
+    """启动后台接口服务器 (port=0 时自动分配端口)，返回服务器对象。"""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="招采数据只读查询接口")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    server.daemon_threads = True
+    print(f"查询接口已启动：http://{args.host}:{args.port}/api/tasks")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
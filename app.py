@@ -1,54 +1,62 @@
 # app.py
 
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.io as pio
-import json
-import os
+
+from task_registry import load_task_registry
+from dataset_cache import load_metadata, load_dataset, load_rollups, load_time_index, load_crawl_metrics, load_search_index, load_records_by_id, load_deadline_index, load_sort_order, load_detail_summaries, build_links, DAY_ORDER, DETAIL_SUMMARY_LABELS
 
 # --- CONFIGURATION ---
-OUTPUT_DIR = "./zgyd"
-METADATA_PATH = os.path.join(OUTPUT_DIR, "metadata.json")
-
-# 定义所有需要采集的任务配置 (用于识别文件名)
-TASK_CONFIG = {
-    "TASK_1": {"payload": {}, "name": "所有招采"},
-    "TASK_2": {"payload": {"homePageQueryType": "Bidding"}, "name": "所有招采_正在招标"},
-    "TASK_3": {"payload": {"homePageQueryType": "Bidding", "companyType": "BJ"}, "name": "所有招采_正在招标_北京"},
+
+# 任务配置 (数据集名称、Tab 顺序、更新计划描述) 与爬虫共用 tasks.json 注册表
+TASK_CONFIG = load_task_registry()
+
+# 抓取健康 Tab 的名称 (位于所有任务 Tab 之后)
+CRAWL_HEALTH_TAB = "抓取健康"
+
+# 搜索结果每页显示的记录数
+SEARCH_PAGE_SIZE = 50
+
+# 原始数据表：可选的每页条数和排序字段 (显示名称 -> 数据集列)
+RAW_TABLE_PAGE_SIZES = [100, 200, 500]
+RAW_TABLE_SORT_COLUMNS = {
+    '发布时间': 'PublishDateTime',
+    '截标时间': 'backDate',
+    '文件售卖截止时间': 'tenderSaleDeadline',
+    '公示截止时间': 'publicityEndTime',
+    '单位': 'companyTypeName',
+    '标题': 'name',
 }
 
-# 任务对应的动态更新计划描述
-TASK_UPDATE_SCHEDULES = {
-    "TASK_1": "每日 06:00 更新",
-    "TASK_2": "每日 02:10, 06:10, 10:10, 14:10, 18:10, 22:10 更新",
-    "TASK_3": "每日 06:00-23:59 每时 15, 25, 35, 45, 55 分更新",
+# 每日更新频次图的点数预算：范围内按日的柱数超出预算时依次改为按周、按月汇总，图表数据量与历史长度无关
+CHART_MAX_POINTS = 400
+# 图表粒度：(名称, 预聚合统计键, Plotly 周期, 刻度格式, 可用的范围按钮)
+RANGE_BUTTONS = {
+    "1周": dict(count=7, label="1周", step="day", stepmode="backward"),
+    "1月": dict(count=1, label="1月", step="month", stepmode="backward"),
+    "1季": dict(count=3, label="1季", step="month", stepmode="backward"),
+    "1年": dict(count=1, label="1年", step="year", stepmode="backward"),
+    "全部": dict(step="all", label="全部"),
 }
+CHART_RESOLUTIONS = [
+    ("日", "daily", None, "%Y-%m-%d", ["1周", "1月", "1季", "1年", "全部"]),
+    ("周", "weekly", 7 * 24 * 3600 * 1000, "%Y-%m-%d", ["1季", "1年", "全部"]),
+    ("月", "monthly", "M1", "%Y-%m", ["1年", "全部"]),
+]
 
+# 即将截止列表的可选时间窗口 (小时) 及截止时间字段名称 (与 crawler.DEADLINE_FIELDS 一致)
+CLOSING_SOON_WINDOWS = [24, 48, 72, 168]
+DEADLINE_LABELS = {'backDate': '截标时间', 'tenderSaleDeadline': '文件售卖截止时间', 'publicityEndTime': '公示截止时间'}
 
 # --- METADATA AND DATA LOADING ---
-
-def load_metadata():
-    """Loads the last successful crawl time for all tasks."""
-    if os.path.exists(METADATA_PATH):
-        try:
-            with open(METADATA_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def load_data(task_name):
-    """Loads data from a local JSON file."""
-    output_path = os.path.join(OUTPUT_DIR, f"{task_name}.json")
-    if os.path.exists(output_path):
-        try:
-            with open(output_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return None
-    return None
+# 数据集由 dataset_cache 模块在进程内共享缓存，按文件版本 (mtime + 大小) 自动失效
 
 
 # --- DATA ANALYSIS AND PLOTTING FUNCTION ---
@@ -57,20 +65,21 @@ def load_data(task_name):
 pio.templates.default = "plotly_dark"
 
 
-def show_statistics(all_content, data_name, crawl_time, task_key):
+def show_statistics(rollups, data_name, crawl_time, task_key):
+    """根据爬虫生成的预聚合统计绘制图表，绘图耗时与数据集大小无关；原始记录只在分页的原始数据表中按页取出。"""
 
     # st.markdown("---")
     # st.header(f"{data_name}")
 
     # 获取记录总数
-    record_count = len(all_content) if all_content is not None else 0
+    record_count = rollups["total"] if rollups is not None else 0
 
     # ---------------------------------------------------------
     # 显示采集状态和数据条数
     # ---------------------------------------------------------
     
     # 动态获取更新计划描述
-    schedule_text = TASK_UPDATE_SCHEDULES.get(task_key, "由 GitHub Action 定时更新")
+    schedule_text = TASK_CONFIG[task_key].get("schedule") or "由 GitHub Action 定时更新"
 
     col_time, col_info, col_count = st.columns([1, 2, 1])
 
@@ -94,42 +103,25 @@ def show_statistics(all_content, data_name, crawl_time, task_key):
     # st.markdown("---")
     # ---------------------------------------------------------
 
-    if not all_content:
+    if not record_count:
         st.warning("无数据可供分析。")
         return
 
-    df = pd.DataFrame(all_content)
+    # 日期范围和单位筛选：默认范围 (截止日期之后的全部记录) 直接使用预聚合统计，
+    # 否则由发布时间排序索引做区间查询
+    start_date, end_date, unit_names, is_default = show_filters(rollups, task_key)
+    if not is_default:
+        time_index = load_time_index(data_name)
+        if time_index is not None:
+            rollups = time_index.rollups(start_date, end_date + timedelta(days=1), unit_names)
+    filtered_count = rollups["filtered"]
 
-    # 修复了 locale.Error 的代码
-    if df.empty or 'publishDate' not in df.columns:
-        st.warning("DataFrame 为空或缺少 'publishDate' 字段。无法生成图表。")
-        return
+    if is_default and record_count != filtered_count:
+        st.info(f"已过滤 {record_count - filtered_count} 条早于 {start_date} 的历史噪音记录。")
+    elif not is_default:
+        st.info(f"筛选范围内共 {filtered_count} 条记录 (总计 {record_count} 条)。")
 
-    try:
-        df['PublishDateTime'] = pd.to_datetime(df['publishDate'])
-    except Exception as e:
-        st.error(f"日期格式转换错误: {e}")
-        return
-
-    cutoff_date = pd.to_datetime('2024-01-01')
-    initial_count = len(df)
-    df = df[df['PublishDateTime'] >= cutoff_date].copy()
-    filtered_count = len(df)
-
-    if initial_count != filtered_count:
-        st.info(f"已过滤 {initial_count - filtered_count} 条早于 {cutoff_date.date()} 的历史噪音记录。")
-
-    df['PublishDateOnly'] = df['PublishDateTime'].dt.date
-    df['PublishHour'] = df['PublishDateTime'].dt.hour
-
-    # 使用不带 locale 参数的方法获取英文名称
-    df['PublishDayOfWeek'] = df['PublishDateTime'].dt.day_name()
-
-    # 中文映射逻辑
-    day_map = {'Monday': '周一', 'Tuesday': '周二', 'Wednesday': '周三', 'Thursday': '周四', 'Friday': '周五', 'Saturday': '周六', 'Sunday': '周日'}
-    df['PublishDayOfWeek'] = df['PublishDayOfWeek'].map(day_map)
-    day_order = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-    df['PublishDayOfWeek'] = pd.Categorical(df['PublishDayOfWeek'], categories=day_order, ordered=True)
+    day_order = DAY_ORDER
 
     plotly_config = {
         # 替代 use_container_width=True
@@ -140,25 +132,36 @@ def show_statistics(all_content, data_name, crawl_time, task_key):
 
     # --- Plotting Logic (保持不变) ---
     # st.subheader("1. 每日更新频次")
-    frequency_df = df.groupby(['PublishDateOnly', 'PublishDayOfWeek'], observed=True)['PublishDateTime'].count().reset_index()
-    frequency_df.columns = ['PublishDate', 'PublishDayOfWeek', 'UpdateCount']
-    frequency_df = frequency_df.sort_values('PublishDate')
-    fig_freq = px.bar(frequency_df, x='PublishDate', y='UpdateCount', title='每日更新频次', labels={'UpdateCount': '更新频次', 'PublishDate': '日期', 'PublishDayOfWeek': '周几'}, hover_data=['PublishDayOfWeek'], height=500)
-    fig_freq.update_xaxes(tickangle=-45, rangeslider_visible=True, rangeselector=dict(bgcolor="#333333", activecolor="#555555", font=dict(color="white"), buttons=[dict(count=7, label="1周", step="day", stepmode="backward"), dict(count=1, label="1月", step="month", stepmode="backward"), dict(count=3, label="1季", step="month", stepmode="backward"), dict(count=1, label="1年", step="year", stepmode="backward"), dict(step="all", label="全部")]), tickformat="%Y-%m-%d")
-    st.plotly_chart(fig_freq, config=plotly_config)
+    # 按点数预算选择粒度：日 -> 周 -> 月，使用预聚合的多粒度统计，不回到原始记录
+    resolution, rollup_key, period, tick_format, button_labels = choose_chart_resolution(rollups)
+    buckets = rollups[rollup_key]
+    frequency_df = pd.DataFrame({'PublishDate': pd.to_datetime(list(buckets.keys())), 'UpdateCount': list(buckets.values())})
+    if rollup_key == "daily":
+        frequency_df['PublishDayOfWeek'] = frequency_df['PublishDate'].dt.weekday.map(dict(enumerate(day_order)))
+        hover_data = ['PublishDayOfWeek']
+    else:
+        hover_data = None
+    title = '每日更新频次' if rollup_key == "daily" else f'更新频次 (按{resolution}汇总)'
+    fig_freq = px.bar(frequency_df, x='PublishDate', y='UpdateCount', title=title, labels={'UpdateCount': '更新频次', 'PublishDate': '日期', 'PublishDayOfWeek': '周几'}, hover_data=hover_data, height=500)
+    if period is not None:
+        # 柱宽覆盖整个周期并居中于周期内
+        fig_freq.update_traces(xperiod=period, xperiod0=frequency_df['PublishDate'].min() if not frequency_df.empty else None, xperiodalignment="middle", hovertemplate=f"{resolution}: %{{x|{tick_format}}}<br>更新频次: %{{y}}<extra></extra>")
+    fig_freq.update_xaxes(tickangle=-45, rangeslider_visible=True, rangeselector=dict(bgcolor="#333333", activecolor="#555555", font=dict(color="white"), buttons=[RANGE_BUTTONS[label] for label in button_labels]), tickformat=tick_format)
+    st.plotly_chart(fig_freq, config=plotly_config, key=f"{task_key}_freq")
 
     # st.subheader("2. 更新活跃度分析")
     col1, col2 = st.columns(2)
     with col1:
-        time_df_hour = df.groupby('PublishHour', observed=True)['PublishDateTime'].count().reset_index(name='UpdateCount')
+        time_df_hour = pd.DataFrame({'PublishHour': range(24), 'UpdateCount': rollups["hourly"]})
         fig_hour = px.bar(time_df_hour, x='PublishHour', y='UpdateCount', title='更新活跃时段', labels={'PublishHour': '时刻', 'UpdateCount': '更新频次'}, height=400)
         fig_hour.update_layout(xaxis={'tickmode': 'linear', 'dtick': 1, 'range': [-0.5, 23.5]})
-        st.plotly_chart(fig_hour, config=plotly_config)
+        st.plotly_chart(fig_hour, config=plotly_config, key=f"{task_key}_hour")
     with col2:
         hour_order = list(range(24))
-        time_df_heatmap = df.groupby(['PublishHour', 'PublishDayOfWeek'], observed=True).size().reset_index(name='UpdateCount')
-        index = pd.MultiIndex.from_product([hour_order, day_order], names=['PublishHour', 'PublishDayOfWeek'])
-        time_df_heatmap = time_df_heatmap.set_index(['PublishHour', 'PublishDayOfWeek']).reindex(index, fill_value=0).reset_index()
+        time_df_heatmap = pd.DataFrame(
+            [(hour, day_order[weekday], count) for hour, row in enumerate(rollups["hour_weekday"]) for weekday, count in enumerate(row)],
+            columns=['PublishHour', 'PublishDayOfWeek', 'UpdateCount']
+        )
         time_df_heatmap['PublishDayOfWeek'] = pd.Categorical(time_df_heatmap['PublishDayOfWeek'], categories=day_order, ordered=True)
         fig_heatmap = px.density_heatmap(time_df_heatmap, x="PublishHour", y="PublishDayOfWeek", z="UpdateCount", title='更新活跃热力图', labels={"PublishHour": "时刻", "PublishDayOfWeek": "周几", "UpdateCount": "更新频次"}, category_orders={"PublishDayOfWeek": day_order, "PublishHour": hour_order}, nbinsx=24, color_continuous_scale=px.colors.sequential.Viridis, height=400)
         fig_heatmap.update_xaxes(range=[-0.5, 23.5], tickmode='linear', dtick=1)
@@ -173,83 +176,257 @@ def show_statistics(all_content, data_name, crawl_time, task_key):
             ),
             coloraxis_colorbar_title_text='更新频次'  # 去掉 "sum of"
         )
-        st.plotly_chart(fig_heatmap, config=plotly_config)
-
-
-    # 3. 原始数据表格 (仅限北京) 
-    if data_name == "所有招采_正在招标_北京":
-        # st.subheader("3. 原始数据表")
-
-        # 1. 定义 BASE_URL 
-        BASE_URL = 'https://b2b.10086.cn'
-        
-        # 2. 【精确复制 crawler.py 逻辑】构造 URL 字段，并确保 None/NaN 转换为空字符串
-        def build_link_safely(row):
-            # 这是一个强健的函数，用于处理 Series 中的 None/NaN，确保 URL 参数中不会出现 'None' 字符串
-            def safe_param(key):
-                value = row.get(key)
-                # 使用 pd.notna 检查非空值，并转换为字符串
-                if pd.notna(value) and value is not None:
-                    return str(value)
-                # 否则返回空字符串，与 crawler.py 中的 .get(key, '') 效果一致
-                return ''
-
-            # 精确使用 crawler.py 中的字段名
-            link_id = safe_param('id')
-            link_uuid = safe_param('uuid')
-            link_publish_type = safe_param('publishType')
-            link_publish_one_type = safe_param('publishOneType')
-            
-            # 构造 URL (与 crawler.py 模板完全一致)
-            return (
-                f'{BASE_URL}/#/noticeDetail?'
-                f'publishId={link_id}&'
-                f'publishUuid={link_uuid}&'
-                f'publishType={link_publish_type}&'
-                f'publishOneType={link_publish_one_type}'
-            )
+        st.plotly_chart(fig_heatmap, config=plotly_config, key=f"{task_key}_heatmap")
+
+    # 3. 原始数据表格：只有这里需要原始记录，每次只取一页
+    if TASK_CONFIG[task_key].get("deadlines"):
+        show_closing_soon(data_name, task_key)
+    show_raw_table(data_name, task_key, start_date, end_date, unit_names)
+
+
+def choose_chart_resolution(rollups):
+    """返回柱数不超过 CHART_MAX_POINTS 的最细粒度 (都超出时使用最粗的按月汇总)。"""
+    for resolution in CHART_RESOLUTIONS:
+        if len(rollups.get(resolution[1]) or {}) <= CHART_MAX_POINTS:
+            return resolution
+    return CHART_RESOLUTIONS[-1]
+
+
+def show_filters(rollups, task_key):
+    """
+    渲染发布日期范围和单位筛选控件，返回 (开始日期, 结束日期, 单位列表, 是否为默认筛选)。
+    默认范围为预聚合截止日期 (历史噪音过滤) 到最新发布日期，单位列表为空表示全部单位。
+    """
+    cutoff = pd.to_datetime(rollups["cutoff"]).date()
+    days = list(rollups["daily"].keys())
+    first_day = pd.to_datetime(rollups.get("first_day") or (days[0] if days else cutoff)).date()
+    last_day = pd.to_datetime(rollups.get("last_day") or (days[-1] if days else cutoff)).date()
+    default_start, default_end = max(cutoff, first_day), max(cutoff, first_day, last_day)
+
+    col_range, col_units = st.columns([1, 2])
+    with col_range:
+        date_range = st.date_input(
+            "发布日期范围", value=(default_start, default_end), min_value=min(first_day, default_start), max_value=default_end,
+            key=f"{task_key}_date_range",
+        )
+    with col_units:
+        units = rollups.get("units") or {}
+        unit_names = st.multiselect(
+            "单位", options=list(units), format_func=lambda unit: f"{unit} ({units[unit]})",
+            placeholder="全部单位", key=f"{task_key}_units",
+        ) if units else []
+
+    # 日期选择器在只选了开始日期时返回单个日期
+    start_date = date_range[0] if len(date_range) > 0 else default_start
+    end_date = date_range[1] if len(date_range) > 1 else default_end
+    is_default = start_date == default_start and end_date == default_end and not unit_names
+    return start_date, end_date, unit_names, is_default
+
+
+def render_records_table(df, height=600, sort_by_date=True):
+    """渲染记录表 (单位、标题、链接和各时间字段)。df 可能是共享数据集的切片，此处不得原地修改。"""
+    # 链接列由 dataset_cache 在加载数据集时向量化生成，其他来源的记录在此补齐
+    if 'LINK' not in df.columns:
+        df = df.assign(LINK=build_links(df))
+
+    required_cols_map = {
+        'companyTypeName': '单位',
+        'name': '标题',
+        'LINK': '链接',
+        'publishDate': '发布时间',
+        'tenderSaleDeadline': '文件售卖截止时间',
+        'publicityEndTime': '公示截止时间',
+        'backDate': '截标时间'
+    }
+
+    # 合并所有必要的列
+    all_required_keys = list(required_cols_map.keys())
+    # 由于 df 已经有 URL_LINK，我们需要确保它也被检查
+    available_cols = [col for col in all_required_keys if col in df.columns]
 
-        # 应用新的构建函数
-        df['LINK'] = df.apply(build_link_safely, axis=1)
-
-        required_cols_map = {
-            'companyTypeName': '单位',
-            'name': '标题',
-            'LINK': '链接',
-            'publishDate': '发布时间',
-            'tenderSaleDeadline': '文件售卖截止时间',
-            'publicityEndTime': '公示截止时间',
-            'backDate': '截标时间'
+    if not available_cols:
+        st.warning("无法显示数据表：抓取的数据中缺少必要的字段。")
+        return
+
+    rename_map = {col: required_cols_map[col] for col in available_cols}
+    display_df = df[available_cols].rename(columns=rename_map)
+
+    # 爬虫已缓存详情的公告补充预算、采购方式和联系人 (只显示有值的列)
+    if 'uuid' in df.columns and not df.empty:
+        details = pd.DataFrame(load_detail_summaries(df['uuid']), index=df.index, columns=DETAIL_SUMMARY_LABELS)
+        details = details.dropna(axis=1, how='all')
+        if not details.empty:
+            position = display_df.columns.get_loc('链接') + 1 if '链接' in display_df.columns else len(display_df.columns)
+            display_df = pd.concat([display_df.iloc[:, :position], details, display_df.iloc[:, position:]], axis=1)
+
+    if sort_by_date and '发布时间' in display_df.columns:
+        display_df = display_df.sort_values(by='发布时间', ascending=False)
+
+    # 【渲染逻辑】使用 st.dataframe，并应用最简 LinkColumn 配置
+    st.dataframe(
+        display_df, 
+        width='stretch', 
+        height=height,
+        column_config={
+            "链接": st.column_config.LinkColumn(
+                help="点击查看项目详情链接",
+                # display_text=":material/open_in_new:"
+                display_text="打开"
+            )
         }
+    )
 
-        # 合并所有必要的列
-        all_required_keys = list(required_cols_map.keys())
-        # 由于 df 已经有 URL_LINK，我们需要确保它也被检查
-        available_cols = [col for col in all_required_keys if col in df.columns]
-
-        if not available_cols:
-            st.warning("无法显示数据表：抓取的数据中缺少必要的字段。")
-            return
-
-        rename_map = {col: required_cols_map[col] for col in available_cols}
-        display_df = df[available_cols].rename(columns=rename_map)
-
-        if '发布时间' in display_df.columns:
-            display_df = display_df.sort_values(by='发布时间', ascending=False)
-
-        # 3. 【渲染逻辑】使用 st.dataframe，并应用最简 LinkColumn 配置
-        st.dataframe(
-            display_df, 
-            width='stretch', 
-            height=600,
-            column_config={
-                "链接": st.column_config.LinkColumn(
-                    help="点击查看项目详情链接",
-                    # display_text=":material/open_in_new:"
-                    display_text="打开"
-                )
-            }
-        )
+
+def show_closing_soon(data_name, task_key):
+    """即将截止：读取爬虫维护的截止时间索引 (与截止提醒推送同一份)，二分查找时间窗口后与当前数据集核对。"""
+    deadlines = load_deadline_index(task_key)
+    if deadlines is None or deadlines.empty:
+        return
+
+    hours = st.selectbox(
+        "即将截止", CLOSING_SOON_WINDOWS, index=CLOSING_SOON_WINDOWS.index(72),
+        format_func=lambda value: f"{value} 小时内", key=f"{task_key}_closing_soon",
+    )
+    # 截止时间为北京时间
+    now = pd.Timestamp.now(tz='Asia/Shanghai').tz_localize(None)
+    lo = deadlines['deadline_time'].searchsorted(now, side='right')
+    hi = deadlines['deadline_time'].searchsorted(now + timedelta(hours=hours), side='right')
+    window = deadlines.iloc[lo:hi]
+
+    records = load_records_by_id(data_name, window['id'].unique().tolist()) if not window.empty else None
+    if records is None or records.empty:
+        st.caption(f"{hours} 小时内没有截止的项目。")
+        return
+    merged = window.merge(records, on='id', how='inner')
+    # 索引中的旧截止时间 (已变更) 与数据集不一致，不显示
+    current = pd.Series(False, index=merged.index)
+    for field in DEADLINE_LABELS:
+        if field in merged.columns:
+            current |= (merged['field'] == field) & (pd.to_datetime(merged[field], errors='coerce') == merged['deadline_time'])
+    merged = merged[current]
+    if merged.empty:
+        st.caption(f"{hours} 小时内没有截止的项目。")
+        return
+
+    display_df = pd.DataFrame({
+        '截止类型': merged['field'].map(DEADLINE_LABELS),
+        '截止时间': merged['deadline_time'],
+        '剩余 (小时)': ((merged['deadline_time'] - now).dt.total_seconds() / 3600).round(1),
+        '单位': merged['companyTypeName'] if 'companyTypeName' in merged.columns else None,
+        '标题': merged['name'] if 'name' in merged.columns else None,
+        '链接': merged['LINK'] if 'LINK' in merged.columns else build_links(merged),
+    })
+    st.caption(f"{hours} 小时内共 {len(display_df)} 个截止时间")
+    st.dataframe(
+        display_df, width='stretch', hide_index=True,
+        column_config={"链接": st.column_config.LinkColumn(help="点击查看项目详情链接", display_text="打开")},
+    )
+
+
+def show_raw_table(data_name, task_key, start_date, end_date, unit_names=None):
+    """
+    分页渲染筛选范围内的原始数据表：筛选由发布时间排序索引的区间查询得到，排序使用预先计算的行顺序，
+    每次只把当前页的记录发送到浏览器。
+    """
+    data_df, time_index = load_dataset(data_name), load_time_index(data_name)
+    if data_df is None or time_index is None:
+        return
+
+    col_sort, col_direction, col_size = st.columns([2, 1, 1])
+    with col_sort:
+        sort_label = st.selectbox("排序字段", list(RAW_TABLE_SORT_COLUMNS), key=f"{task_key}_raw_sort")
+    with col_direction:
+        descending = st.selectbox("顺序", [True, False], format_func=lambda value: "降序" if value else "升序", key=f"{task_key}_raw_desc")
+    with col_size:
+        page_size = st.selectbox("每页条数", RAW_TABLE_PAGE_SIZES, key=f"{task_key}_raw_page_size")
+
+    order = load_sort_order(data_name, RAW_TABLE_SORT_COLUMNS[sort_label], descending)
+    if order is None:
+        st.warning(f"数据集中没有“{sort_label}”字段。")
+        return
+    # 预先排好的行顺序按筛选结果过滤，不需要每次重新排序
+    selected = np.zeros(len(data_df), dtype=bool)
+    selected[time_index.rows_in(start_date, end_date + timedelta(days=1), unit_names)] = True
+    rows = order[selected[order]]
+    if not len(rows):
+        st.info("筛选范围内没有记录。")
+        return
+
+    # 筛选或排序变化时回到第 1 页
+    page_key = f"{task_key}_raw_page"
+    view = (str(start_date), str(end_date), tuple(unit_names or ()), sort_label, descending, page_size)
+    if st.session_state.get(f"{page_key}_view") != view:
+        st.session_state[f"{page_key}_view"] = view
+        st.session_state[page_key] = 1
+    page_count = math.ceil(len(rows) / page_size)
+    page = st.number_input("页码", min_value=1, max_value=page_count, step=1, key=page_key) if page_count > 1 else 1
+    st.caption(f"共 {len(rows)} 条记录，第 {page}/{page_count} 页")
+
+    # st.subheader("3. 原始数据表")
+    render_records_table(data_df.iloc[rows[(page - 1) * page_size: page * page_size]], sort_by_date=False)
+
+
+def show_search(task_name, task_key):
+    """标题/单位全文检索：查询按数据集版本建立的倒排索引，结果按发布时间倒序分页显示。"""
+    search_index = load_search_index(task_name)
+    if search_index is None:
+        return
+
+    query_key, page_key = f"{task_key}_search", f"{task_key}_search_page"
+    query = st.text_input("搜索标题或单位", key=query_key, placeholder=f"在 {len(search_index)} 条记录中搜索，多个关键词用空格分隔")
+    # 查询词变化时回到第 1 页
+    if st.session_state.get(f"{query_key}_last") != query:
+        st.session_state[f"{query_key}_last"] = query
+        st.session_state[page_key] = 1
+    if not query.strip():
+        return
+
+    started = time.perf_counter()
+    result_ids = search_index.search(query)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not result_ids:
+        st.info(f"没有匹配“{query}”的记录。")
+        return
+
+    page_count = math.ceil(len(result_ids) / SEARCH_PAGE_SIZE)
+    page = st.number_input("页码", min_value=1, max_value=page_count, step=1, key=page_key) if page_count > 1 else 1
+    st.caption(f"共 {len(result_ids)} 条匹配记录 (检索耗时 {elapsed_ms:.1f} 毫秒)，第 {page}/{page_count} 页")
+
+    page_df = load_records_by_id(task_name, result_ids[(page - 1) * SEARCH_PAGE_SIZE: page * SEARCH_PAGE_SIZE])
+    if page_df is not None:
+        render_records_table(page_df, height=400, sort_by_date=False)
+
+
+def show_crawl_health(metrics_df):
+    """绘制各任务的抓取耗时和错误率趋势，并列出最近的运行记录。metrics_df 为共享只读对象。"""
+    if metrics_df is None or metrics_df.empty:
+        st.warning("暂无抓取指标 (爬虫运行后自动生成)。")
+        return
+
+    plotly_config = {'use_container_width': True, 'displaylogo': False}
+    labels = {'time': '运行时间', 'duration_s': '耗时 (秒)', 'error_rate': '错误率', 'task': '任务', 'mode': '模式', 'requests': '请求数'}
+
+    latest = metrics_df.groupby('task').tail(1)
+    cols = st.columns(len(latest))
+    for col, (_, run) in zip(cols, latest.iterrows()):
+        with col:
+            st.metric(run['task'], f"{run['duration_s']:.1f} 秒", f"错误率 {run['error_rate']:.1%}", delta_color="off")
+
+    fig_duration = px.line(metrics_df, x='time', y='duration_s', color='task', markers=True, title='抓取耗时趋势', labels=labels, hover_data=['mode', 'requests'], height=400)
+    st.plotly_chart(fig_duration, config=plotly_config, key="crawl_health_duration")
+
+    fig_errors = px.line(metrics_df, x='time', y='error_rate', color='task', markers=True, title='请求错误率趋势', labels=labels, hover_data=['mode', 'requests'], height=400)
+    fig_errors.update_yaxes(tickformat=".0%", rangemode="tozero")
+    st.plotly_chart(fig_errors, config=plotly_config, key="crawl_health_errors")
+
+    recent_cols_map = {
+        'time': '运行时间', 'task': '任务', 'mode': '模式', 'success': '成功', 'duration_s': '耗时 (秒)',
+        'records': '记录数', 'requests': '请求数', 'errors': '错误数', 'retries': '重试数',
+        'latency_p50_ms': '延迟 P50 (ms)', 'latency_p95_ms': '延迟 P95 (ms)', 'sleep_s': '等待 (秒)', 'rate_rps': '速率 (次/秒)',
+    }
+    available_cols = [col for col in recent_cols_map if col in metrics_df.columns]
+    recent_df = metrics_df[available_cols].tail(50).iloc[::-1].rename(columns=recent_cols_map)
+    st.dataframe(recent_df, width='stretch', hide_index=True)
 
 
 # --- MAIN APPLICATION ENTRY POINT ---
@@ -280,23 +457,31 @@ def main():
     task_keys = list(TASK_CONFIG.keys())
     tab_names = [TASK_CONFIG[key]["name"] for key in task_keys]
 
-    # 获取第三个 Tab 的名称
-    default_tab_name = tab_names[2] # 索引 2 对应第三个 Tab
+    # 默认打开注册表中 default_tab 为 true 的任务 (未指定时为第一个)
+    default_tab_name = next((TASK_CONFIG[key]["name"] for key in task_keys if TASK_CONFIG[key].get("default_tab")), tab_names[0])
     
-    # 创建 Streamlit Tabs
-    tabs = st.tabs(tab_names, default=default_tab_name)
+    # 创建 Streamlit Tabs (on_change="rerun" 使 Tab 记录选中状态，只渲染当前选中的 Tab)
+    tabs = st.tabs(tab_names + [CRAWL_HEALTH_TAB], default=default_tab_name, key="task_tab", on_change="rerun")
 
     # 遍历所有任务配置，并在各自的 Tab 内调用 show_statistics
     for i, task_key in enumerate(task_keys):
+        if tabs[i].open is False:
+            continue
         with tabs[i]:
             config = TASK_CONFIG[task_key]
             task_name = config["name"]
 
             crawl_time = metadata.get(task_name)
-            raw_data = load_data(task_name)
+            rollups = load_rollups(task_name)
 
             # 在 Tab 内部调用 show_statistics，它将渲染所有内容
-            show_statistics(raw_data, task_name, crawl_time, task_key)
+            show_statistics(rollups, task_name, crawl_time, task_key)
+            show_search(task_name, task_key)
+
+    # 最后一个 Tab：抓取健康
+    if tabs[-1].open is not False:
+        with tabs[-1]:
+            show_crawl_health(load_crawl_metrics())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+# benchmark.py
+
+"""
+端到端性能基准：基于 mock_server.py 的本地替身服务器，在不同记录规模下测量
+  - 抓取吞吐量 (crawler.scrape_content，记录/秒、请求数、传输量)
+  - 差异对比耗时 (crawler.compare_data_and_generate_report)
+  - show_statistics 的数据准备耗时 (dataset_cache 冷加载 + 统计计算、预聚合文件读取、缓存命中)
+另外检查写出的数据集读回后与原始记录的字段和值一致 (snapshot_store 往返)。
+
+所有输出写入临时目录，不会修改仓库中的 zgyd/。
+
+用法：
+  python benchmark.py                       # 默认 300, 10000, 100000 条
+  python benchmark.py --sizes 300,10000 --latency 0.05 --error-rate 0.01 --rps 20
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from snapshot_store import read_snapshot
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [300, 10000, 100000]
+# 差异对比基准中新增、删除、修改的记录比例
+DIFF_CHURN = 0.01
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="爬虫与看板性能基准")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="逗号分隔的记录规模")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务器每个请求的基础延迟 (秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务器返回 500 的概率")
+    parser.add_argument("--rps", type=float, default=0.0, help="爬虫初始每秒请求数 (运行中自适应调整)，0 表示不限速 (只测量爬虫自身开销)")
+    parser.add_argument("--workers", type=int, default=None, help="爬虫并发线程数 (默认同 CRAWLER_MAX_WORKERS)")
+    parser.add_argument("--json", dest="json_path", help="将结果写入该 JSON 文件")
+    return parser.parse_args()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_crawl(crawler, mock_server, records, workers, latency=0.0, error_rate=0.0):
+    """抓取吞吐量：从替身服务器完整抓取一次无过滤查询。"""
+    server = mock_server.start_server(records, latency=latency, error_rate=error_rate)
+    crawler.POST_URL = server.url
+    try:
+        session = crawler.create_session(workers)
+        (data, success), elapsed = timed(crawler.scrape_content, {}, f"bench_{len(records)}", session=session, max_workers=workers)
+    finally:
+        server.shutdown()
+        server.server_close()
+    if not success or len(data) != len(records):
+        raise RuntimeError(f"抓取结果不完整：{len(data)}/{len(records)}")
+    return data, {
+        "crawl_seconds": round(elapsed, 3),
+        "crawl_records_per_second": round(len(data) / elapsed, 1),
+        "crawl_requests": server.requests,
+        "crawl_errors": server.errors,
+        "crawl_megabytes": round(server.bytes_sent / 1e6, 2),
+    }
+
+
+def bench_diff(crawler, records):
+    """差异对比：旧索引相对新数据缺少 1% (新增)、多出 1% (删除)、1% 关键字段不同 (修改)。"""
+    churn = max(1, int(len(records) * DIFF_CHURN))
+    old_index = {item['id']: crawler.build_index_entry(item) for item in records[churn:]}
+    for n, item in enumerate(records[-churn:]):
+        old_index[f"removed-{n}"] = crawler.build_index_entry(dict(item, id=f"removed-{n}"))
+    for item in records[churn:2 * churn]:
+        old_index[item['id']] = crawler.build_index_entry(dict(item, backDate="1970-01-01 00:00:00"))
+
+    (added, removed, modified, _), elapsed = timed(crawler.compare_data_and_generate_report, records, old_index)
+    _, report_elapsed = timed(crawler.split_markdown_report, next(iter(crawler.TASK_CONFIG)), added, removed, modified)
+    return {
+        "diff_ms": round(elapsed * 1000, 1),
+        "diff_changes": len(added) + len(removed) + len(modified),
+        "report_ms": round(report_elapsed * 1000, 1),
+    }
+
+
+def check_snapshot_roundtrip(crawler, records, task_name):
+    """
+    写出的数据集读回后，每条记录的键集合和值须与写入的记录 (delta 存储方式下去掉 VOLATILE_FIELDS) 一致：
+    先检查基础快照，再写入一份有修改 (字段置为 null) 和删除的数据，检查增量文件重放后的结果。
+    """
+    check_snapshot_equal(crawler, records, task_name)
+    if len(records) > 1:
+        changed = [dict(records[0], name=None)] + records[1:-1]
+        crawler.write_dataset(changed, task_name)
+        check_snapshot_equal(crawler, changed, task_name)
+        crawler.write_dataset(records, task_name)
+        check_snapshot_equal(crawler, records, task_name)
+
+
+def check_snapshot_equal(crawler, records, task_name):
+    dropped = crawler.VOLATILE_FIELDS if crawler.DATASET_STORAGE == "delta" else set()
+    expected = {
+        str(item['id']): {key: value for key, value in item.items() if key not in dropped}
+        for item in records
+    }
+    actual = {str(item['id']): item for item in read_snapshot(crawler.get_output_path(task_name))}
+    if actual.keys() != expected.keys():
+        raise RuntimeError(f"数据集读回的记录数不一致：{len(actual)}/{len(expected)}")
+    for record_id, item in expected.items():
+        if set(actual[record_id]) != set(item):
+            raise RuntimeError(f"记录 {record_id} 读回的字段不一致：缺少 {sorted(set(item) - set(actual[record_id]))}，多出 {sorted(set(actual[record_id]) - set(item))}")
+        if actual[record_id] != item:
+            raise RuntimeError(f"记录 {record_id} 读回的值不一致")
+
+
+def bench_statistics(crawler, dataset_cache, records):
+    """show_statistics 数据准备：写出数据集后分别测量冷加载计算、预聚合读取和缓存命中。"""
+    task_name = f"bench_{len(records)}"
+    _, write_elapsed = timed(crawler.write_dataset, records, task_name)
+    check_snapshot_roundtrip(crawler, records, task_name)
+
+    dataset_cache._cache.clear()
+    df, load_elapsed = timed(dataset_cache.load_dataset, task_name)
+    _, compute_elapsed = timed(dataset_cache.compute_rollups, df)
+
+    dataset_cache._cache.clear()
+    _, rollups_elapsed = timed(dataset_cache.load_rollups, task_name)
+    _, hit_elapsed = timed(dataset_cache.load_rollups, task_name)
+    return {
+        "write_dataset_ms": round(write_elapsed * 1000, 1),
+        "prep_load_ms": round(load_elapsed * 1000, 1),
+        "prep_compute_rollups_ms": round(compute_elapsed * 1000, 1),
+        "prep_precomputed_rollups_ms": round(rollups_elapsed * 1000, 1),
+        "prep_cache_hit_ms": round(hit_elapsed * 1000, 3),
+    }
+
+
+def print_results(results):
+    columns = [
+        ("records", "记录数"), ("crawl_seconds", "抓取(秒)"), ("crawl_records_per_second", "记录/秒"),
+        ("crawl_requests", "请求数"), ("crawl_megabytes", "传输(MB)"), ("diff_ms", "差异对比(ms)"),
+        ("report_ms", "报告生成(ms)"), ("write_dataset_ms", "写出数据集(ms)"), ("prep_load_ms", "冷加载(ms)"),
+        ("prep_compute_rollups_ms", "统计计算(ms)"), ("prep_precomputed_rollups_ms", "读取预聚合(ms)"),
+        ("prep_cache_hit_ms", "缓存命中(ms)"),
+    ]
+    print("\n" + "=" * 50)
+    for key, label in columns:
+        print(f"{label:<16}" + "".join(f"{str(result.get(key, '')):>14}" for result in results))
+    print("=" * 50)
+
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    # 爬虫在导入时读取这些配置；输出目录为相对路径 ./zgyd，切换到临时目录后所有写入都落在临时目录中
+    os.environ["CRAWLER_RPS"] = str(args.rps)
+    if args.workers:
+        os.environ["CRAWLER_MAX_WORKERS"] = str(args.workers)
+    sys.path.insert(0, ROOT_DIR)
+    import crawler
+    import dataset_cache
+    import mock_server
+
+    workdir = tempfile.mkdtemp(prefix="zgyd_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = []
+    try:
+        for size in sizes:
+            print(f"[*] 生成 {size} 条记录...")
+            records = mock_server.generate_records(size, fixture_dir=os.path.join(ROOT_DIR, "zgyd"))
+            result = {"records": size}
+            data, crawl_result = bench_crawl(crawler, mock_server, records, crawler.MAX_WORKERS, args.latency, args.error_rate)
+            result.update(crawl_result)
+            result.update(bench_diff(crawler, data))
+            result.update(bench_statistics(crawler, dataset_cache, data))
+            results.append(result)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"结果已写入 {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,124 @@
 # crawler.py
 
-import random, requests, ssl, time, json, os, sys
+import random, requests, ssl, time, json, os, sys, math, threading, multiprocessing, hashlib, sqlite3, textwrap, heapq
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from requests.adapters import HTTPAdapter
-from datetime import datetime
+from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
 import pytz
 
+from task_registry import load_task_registry, get_schedules
+from snapshot_store import SnapshotWriter, read_snapshot, compact_snapshot, remove_deltas, dataset_version
+
 # --- CONFIGURATION ---
 BASE_URL = 'https://b2b.10086.cn'
-POST_URL = f'{BASE_URL}/api-b2b/api-sync-es/white_list_api/b2b/publish/queryList'
+POST_URL = os.environ.get("CRAWLER_POST_URL", f'{BASE_URL}/api-b2b/api-sync-es/white_list_api/b2b/publish/queryList')  # 可指向 mock_server.py 进行本地测试
 OUTPUT_DIR = "./zgyd"
 METADATA_PATH = os.path.join(OUTPUT_DIR, "metadata.json")
-TASK_3_STATE_PATH = os.path.join(OUTPUT_DIR, "task_3_state.json")  # 状态文件路径：用于 TASK 3 的差异对比
 
-# 定义所有需要采集的任务配置
-TASK_CONFIG = {
-    "TASK_1": {"payload": {}, "name": "所有招采"},
-    "TASK_2": {"payload": {"homePageQueryType": "Bidding"}, "name": "所有招采_正在招标"},
-    "TASK_3": {"payload": {"homePageQueryType": "Bidding", "companyType": "BJ"}, "name": "所有招采_正在招标_北京"},
+# 参与差异对比的关键字段 (及其在报告中的名称)；链接字段仅保存在索引中用于生成删除条目的链接
+DIFF_FIELDS = {
+    'name': '标题',
+    'publishDate': '发布时间',
+    'tenderSaleDeadline': '文件售卖截止时间',
+    'publicityEndTime': '公示截止时间',
+    'backDate': '截标时间',
+}
+LINK_FIELDS = ['id', 'uuid', 'publishType', 'publishOneType']
+
+# 截止提醒 (tasks.json 中 deadlines 为 true 的任务)：截止时间索引按时间排成最小堆，每次运行只弹出进入提醒窗口的条目，每个截止时间只提醒一次
+DEADLINE_FIELDS = ['backDate', 'tenderSaleDeadline', 'publicityEndTime']
+CLOSING_SOON_HOURS = float(os.environ.get("CLOSING_SOON_HOURS", "24"))
+
+# 并发分页：首页获取总数后，其余页面由线程池并发抓取，所有线程共享同一个全局速率预算
+# 默认值接近原先逐页随机等待 2-5 秒的节奏 (约 0.3 次/秒，最高 1 次/秒)，更高的速率需通过环境变量显式开启
+MAX_WORKERS = int(os.environ.get("CRAWLER_MAX_WORKERS", "2"))  # 设为 1 即退回逐页串行抓取
+REQUESTS_PER_SECOND = float(os.environ.get("CRAWLER_RPS", "0.3"))  # 初始 (基准) 每秒请求数，0 表示不限速
+
+# 自适应速率 (AIMD)：响应快时每次成功请求加性提速，遇到 429/5xx/连接错误时乘性降速，响应变慢时小幅降速
+MIN_REQUESTS_PER_SECOND = float(os.environ.get("CRAWLER_MIN_RPS", "0.1"))
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("CRAWLER_MAX_RPS", "1.0"))
+RATE_INCREASE_STEP = 0.1       # 每次快速成功响应增加的请求数/秒
+RATE_DECREASE_FACTOR = 0.5     # 服务器拒绝或出错时的降速倍数 (同一冷却期内只降一次)
+RATE_SLOW_FACTOR = 0.9         # 响应慢于 RATE_LATENCY_TARGET 时的降速倍数
+RATE_LATENCY_TARGET = 2.0      # 秒
+RATE_DECREASE_COOLDOWN = 2.0   # 秒，避免同一批并发失败连续多次降速
+
+# 单页失败重试：带抖动的指数退避 (基准 RETRY_BACKOFF_BASE 秒，每次翻倍)
+MAX_RETRIES = int(os.environ.get("CRAWLER_MAX_RETRIES", "3"))
+RETRY_BACKOFF_BASE = 2.0
+# 断点续抓：超过该时长的断点视为过期 (列表按时间倒序，旧断点的页码已经偏移)
+CHECKPOINT_MAX_AGE_HOURS = 6
+
+# 增量模式和变更探测：增量抓取无法发现已下线的记录，首页指纹也看不到首页之外的字段变化，
+# 因此每隔一段时间仍执行一次全量抓取
+FULL_REFRESH_HOURS = float(os.environ.get("CRAWLER_FULL_REFRESH_HOURS", "24"))
+
+# 历史库：按记录保存 first_seen / last_seen / removed_at，JSON 数据集由其导出。
+# 不提交到仓库 (由 GitHub Actions 缓存在运行之间保存)，缺失时从本次抓取结果重新开始累计
+HISTORY_DB_PATH = os.path.join(OUTPUT_DIR, "history.db")
+# 每次请求都会变化的分页/时间戳字段，不参与内容哈希
+VOLATILE_FIELDS = {"stime", "current", "pageNum", "pageSize", "size", "total"}
+
+# 列式数据集：仅保留非空列，低基数字符串列使用字典编码
+DICTIONARY_COLUMNS = ["companyTypeName", "publishType"]
+
+# 预聚合统计：只统计该日期之后的记录 (与 app.py 的历史噪音过滤一致)
+ROLLUP_CUTOFF_DATE = "2024-01-01"
+
+# Server 酱推送：并发投递到所有接收者，单个接收者失败时带退避重试；超长报告按条目拆分为多条消息
+NOTIFY_MAX_WORKERS = 8
+NOTIFY_MAX_RETRIES = int(os.environ.get("NOTIFY_MAX_RETRIES", "3"))
+NOTIFY_MAX_MESSAGE_BYTES = 30000  # 单条消息 desp 的 UTF-8 字节上限 (Server 酱限制约 32KB)
+# 投递日志：记录每个接收者的投递结果，未送达的消息在下次运行时补发 (不保存含 SendKey 的 URL)
+NOTIFY_LOG_PATH = os.path.join(OUTPUT_DIR, "notify_log.json")
+NOTIFY_LOG_MAX_HISTORY = 200
+
+# 抓取指标：每次运行的汇总追加写入 NDJSON 文件，超过大小上限时轮转为 .1 文件 (只保留一份旧文件)
+CRAWL_METRICS_PATH = os.path.join(OUTPUT_DIR, "crawl_metrics.ndjson")
+CRAWL_METRICS_MAX_BYTES = 256 * 1024
+# 设置后逐请求指标也会追加写入该 NDJSON 文件 (仅用于本地排查，不提交到仓库)
+CRAWL_REQUEST_LOG = os.environ.get("CRAWL_REQUEST_LOG")
+
+# 多任务运行时，不同查询的任务组分配到进程池并行执行 (所有进程共享一个全局速率预算)；设为 1 即在当前进程中依次执行
+MAX_PROCESSES = int(os.environ.get("CRAWLER_PROCESSES", "4"))
+
+# 多个进程同时写入历史库时，等待写锁的秒数
+HISTORY_DB_TIMEOUT = 600
+
+# JSON 数据集的存储方式：full (默认) 为每次整体重写 indent=4 的 JSON 数组，直接读取 zgyd/<数据集>.json 的外部工具不受影响；
+# delta 为按 id 排序的紧凑基础快照 + 每次运行的增量文件 (见 snapshot_store.py)，git 变动小得多，
+# 但 zgyd/<数据集>.json 变为 {"version","seq","count","fields","records"} 对象，需要重放 .delta.NNNNNN.json 才能得到完整数据
+# (本仓库的 app.py / api.py 通过 snapshot_store 读取，两种格式都支持)。
+DATASET_STORAGE = os.environ.get("CRAWLER_DATASET_STORAGE", "full")
+
+# 公告详情补全 (注册表中 enrich 为 true 的任务)：只为本地缓存中没有的 uuid 抓取详情，结果按 uuid 哈希写入内容寻址缓存。
+# 详情接口未公开，必须通过 CRAWLER_DETAIL_URL 显式指定 (实际接口或 mock_server.py 的 /queryDetail)，未设置时不补全；
+# 请求体为详情页链接中的四个参数
+DETAIL_URL = os.environ.get("CRAWLER_DETAIL_URL")
+DETAIL_CACHE_DIR = os.path.join(OUTPUT_DIR, "details")
+DETAIL_MAX_WORKERS = int(os.environ.get("CRAWLER_DETAIL_WORKERS", "4"))  # 设为 0 即关闭详情补全
+DETAIL_MAX_PER_RUN = int(os.environ.get("CRAWLER_DETAIL_MAX_PER_RUN", "200"))  # 首次运行时限制单次抓取量，其余留到下次
+DETAIL_MAX_RETRIES = int(os.environ.get("CRAWLER_DETAIL_MAX_RETRIES", "1"))
+# 连续失败达到该次数时停止本次运行的详情补全 (接口地址错误或服务不可用时不再逐条重试)
+DETAIL_MAX_CONSECUTIVE_FAILURES = 5
+# 抓取失败的 uuid 记录在缓存中，该时间内不再重试
+DETAIL_MISS_RETRY_HOURS = float(os.environ.get("CRAWLER_DETAIL_MISS_RETRY_HOURS", "24"))
+# 看板和推送中展示的详情字段：显示名称 -> 详情 JSON 中的候选键 (按顺序取第一个非空值)
+DETAIL_SUMMARY_FIELDS = {
+    "预算": ["budgetAmount", "budget", "projectBudget", "estimatedAmount"],
+    "采购方式": ["purchaseMethod", "procurementMethod", "purchaseType", "tenderMethod"],
+    "联系人": ["contactPerson", "contacts", "linkMan", "contactName"],
+    "联系电话": ["contactPhone", "contactTel", "linkPhone", "phone"],
 }
 
+# 所有需要采集的任务配置 (以及 Cron 调度和看板显示) 统一由 tasks.json 注册表定义，字段说明见 task_registry.py
+TASK_CONFIG = load_task_registry()
+
 # --- UTILITIES (Headers, Adapter, Metadata) ---
 
 USER_AGENTS = [
@@ -52,6 +152,116 @@ class CustomHttpAdapter(HTTPAdapter):
         return super(CustomHttpAdapter, self).init_poolmanager(*args, **kwargs)
 
 
+def create_session(pool_size=MAX_WORKERS):
+    """创建挂载 CustomHttpAdapter 的会话，连接池大小不小于并发线程数。"""
+    session = requests.Session()
+    pool_size = max(pool_size, 1)
+    session.mount('https://', CustomHttpAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return session
+
+
+class AdaptiveRateController:
+    """
+    全局自适应请求速率 (线程安全，所有任务和会话共享)。
+    所有请求在发送前调用 wait()，按带抖动的间隔 (1 / rate) 依次领取发送时间片；
+    请求结束后调用 feedback() 按 AIMD 调整速率：
+      - 成功且延迟低于 RATE_LATENCY_TARGET：rate += RATE_INCREASE_STEP
+      - 成功但延迟偏高：rate *= RATE_SLOW_FACTOR
+      - 429 / 5xx / 连接错误：rate *= RATE_DECREASE_FACTOR，429 的 Retry-After 会推迟下一个时间片
+    速率限制在 [min_rate, max_rate] 之间；rate <= 0 时不限速也不调整。
+    多进程运行时由 share() 将状态 (速率、下一个时间片、上次降速时间) 移入共享内存，子进程 attach() 后共用同一个速率预算。
+    """
+
+    def __init__(self, rate, min_rate=MIN_REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND):
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0.0
+        self.max_rate = max(max_rate, rate)
+        self._lock = threading.Lock()
+        self._state = [rate, 0.0, float('-inf')]
+
+    # 状态保存在 _state 中 (普通列表或共享内存数组)，以属性形式访问
+    @property
+    def rate(self):
+        return self._state[0]
+
+    @rate.setter
+    def rate(self, value):
+        self._state[0] = value
+
+    @property
+    def _next_slot(self):
+        return self._state[1]
+
+    @_next_slot.setter
+    def _next_slot(self, value):
+        self._state[1] = value
+
+    @property
+    def _last_decrease(self):
+        return self._state[2]
+
+    @_last_decrease.setter
+    def _last_decrease(self, value):
+        self._state[2] = value
+
+    def share(self):
+        """将速率状态移入进程间共享内存 (time.monotonic 在同一台机器的进程间可比)，返回传给子进程的共享状态。"""
+        state = multiprocessing.Array('d', list(self._state))
+        self.attach(state)
+        return state
+
+    def attach(self, state):
+        """接入 share() 返回的共享状态，之后的 wait() / feedback() 使用跨进程锁。"""
+        self._state = state
+        self._lock = state.get_lock()
+
+    def wait(self):
+        """等待下一个发送时间片，返回实际等待的秒数。"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + random.uniform(0.5, 1.5) / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def feedback(self, latency, status=None, error=None, retry_after=None):
+        """根据一次请求的结果调整速率。status 为 HTTP 状态码 (连接失败时为 None)，error 为异常类型名。"""
+        with self._lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            throttled = status == 429 or (status is not None and status >= 500) or (error is not None and status is None)
+            if throttled:
+                if retry_after:
+                    self._next_slot = max(self._next_slot, now + retry_after)
+                if now - self._last_decrease >= RATE_DECREASE_COOLDOWN:
+                    self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+                    self._last_decrease = now
+            elif error is None:
+                if latency > RATE_LATENCY_TARGET:
+                    self.rate = max(self.min_rate, self.rate * RATE_SLOW_FACTOR)
+                else:
+                    self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+
+    def report(self):
+        return f"{self.rate:.2f} 次/秒" if self.rate > 0 else "不限速"
+
+
+# 模块级共享实例：同一进程中的所有任务、会话和线程共用一个速率
+rate_controller = AdaptiveRateController(REQUESTS_PER_SECOND)
+
+
+def parse_retry_after(response):
+    """读取 Retry-After 响应头 (秒数形式)，无法解析时返回 None。"""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
 def load_metadata():
     if os.path.exists(METADATA_PATH):
         try:
@@ -62,10 +272,17 @@ def load_metadata():
     return {}
 
 
+def write_json_atomic(path, data, **dump_kwargs):
+    """先写入同目录的 .tmp 临时文件再原子替换，读取方 (如同机运行的 app.py) 不会读到写了一半的文件。"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+    os.replace(tmp_path, path)
+
+
 def save_metadata(metadata):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    with open(METADATA_PATH, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=4, ensure_ascii=False)
+    write_json_atomic(METADATA_PATH, metadata, indent=4)
 
 
 # --- Server Chan Push and GitHub State Management ---
@@ -82,42 +299,123 @@ def parse_server_chan_urls(urls_string):
     return [url.strip() for url in urls_string.split(';') if url.strip()]
 
 
-def send_server_chan_notification(server_chan_urls_list, content_md):
+def post_server_chan(url, title, content_md):
+    """单次推送一条消息，成功返回 None，失败返回错误信息。"""
+    try:
+        # Server 酱的内容字段是 'desp'
+        response = requests.post(url, data={"title": title, "desp": content_md}, timeout=10)
+        response.raise_for_status()
+        result = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return f"网络请求失败: {e}"
+    if result.get("code") == 0:
+        return None
+    return f"错误信息: {result.get('message')}"
+
+
+def deliver_to_recipient(url, messages):
+    """
+    按顺序向单个接收者发送所有消息分片，每个分片失败时按带抖动的指数退避重试。
+    返回 (已成功发送的分片数, 最后一次错误信息)，全部成功时错误信息为 None。
+    """
+    for sent, message in enumerate(messages):
+        for attempt in range(NOTIFY_MAX_RETRIES + 1):
+            error = post_server_chan(url, message["title"], message["desp"])
+            if error is None:
+                break
+            if attempt < NOTIFY_MAX_RETRIES:
+                time.sleep(RETRY_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5))
+        else:
+            return sent, error
+    return len(messages), None
+
+
+def get_recipient_id(url):
+    """接收者标识：URL 中包含 SendKey，投递日志只保存其哈希前缀。"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+
+
+def load_delivery_log():
+    if os.path.exists(NOTIFY_LOG_PATH):
+        try:
+            with open(NOTIFY_LOG_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {"pending": {}, "history": []}
+
+
+def save_delivery_log(log):
+    log["history"] = log["history"][-NOTIFY_LOG_MAX_HISTORY:]
+    write_json_atomic(NOTIFY_LOG_PATH, log, indent=4)
+
+
+def dispatch_notifications(jobs, retry=False):
+    """
+    并发向多个接收者投递消息，并将每个接收者的结果写入投递日志。
+    jobs: [(url, [{"title": ..., "desp": ...}, ...]), ...]
+    失败接收者未送达的分片追加到日志的 pending 中，下次运行时由 retry_pending_notifications 补发。
+    retry 为 True 时 jobs 即 pending 本身：成功送达后清除 pending，失败时只保留未送达的部分。
+    """
+    log = load_delivery_log()
+    now_str = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(NOTIFY_MAX_WORKERS, len(jobs)))) as executor:
+        futures = {executor.submit(deliver_to_recipient, url, messages): (i, url, messages) for i, (url, messages) in enumerate(jobs)}
+        for future in as_completed(futures):
+            i, url, messages = futures[future]
+            sent, error = future.result()
+            recipient_id = get_recipient_id(url)
+            log["history"].append({"time": now_str, "recipient": recipient_id, "sent": sent, "total": len(messages), "error": error})
+            if error is None:
+                print(f"[+] 接收者 #{i+1} ({recipient_id}) 推送成功，共 {len(messages)} 条消息。")
+                if retry:
+                    log["pending"].pop(recipient_id, None)
+            else:
+                print(f"[-] 接收者 #{i+1} ({recipient_id}) 推送失败 (已发送 {sent}/{len(messages)} 条)，{error}")
+                # 同一次运行中的多份报告 (变动报告、截止提醒) 失败时都要保留
+                log["pending"][recipient_id] = messages[sent:] if retry else log["pending"].get(recipient_id, []) + messages[sent:]
+
+    save_delivery_log(log)
+
+
+def send_server_chan_notification(server_chan_urls_list, content_md, title):
     """
-    遍历 Server 酱 URL 列表，向所有接收者发送 Markdown 格式的通知。
+    并发向所有接收者发送 Markdown 格式的通知。
     
     Args:
         server_chan_urls_list (list): 包含所有接收者 Server 酱 URL 的列表。
-        content_md (str): Markdown 格式的消息内容。
+        content_md (str | list): Markdown 格式的消息内容，或已按大小拆分的多条消息。
+        title (str): 消息标题，多条消息时自动追加序号。
     """
     if not server_chan_urls_list:
         print("[-] Server Chan URL 列表为空，跳过推送。")
         return
 
-    payload = {
-        "title": "北京开标数据更新",
-        # Server 酱的内容字段是 'desp'
-        "desp": content_md 
-    }
-    
-    # 遍历所有 URL 并逐个发送
-    for i, url in enumerate(server_chan_urls_list):
-        # 截断 URL 以保护隐私，仅打印开头部分
-        display_url = url[:40] + "..." if len(url) > 40 else url
-        print(f"[*] 正在尝试推送至接收者 #{i+1} ({display_url})...")
-        
-        try:
-            response = requests.post(url, data=payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"[+] 接收者 #{i+1} 推送成功。")
-            else:
-                print(f"[-] 接收者 #{i+1} 推送失败，错误信息: {result.get('message')}")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"[-] 接收者 #{i+1} 网络请求失败: {e}")
+    parts = [content_md] if isinstance(content_md, str) else list(content_md)
+    messages = [
+        {"title": title if len(parts) == 1 else f"{title} ({n}/{len(parts)})", "desp": part}
+        for n, part in enumerate(parts, start=1)
+    ]
+    print(f"[*] 正在向 {len(server_chan_urls_list)} 个接收者推送 {len(messages)} 条消息...")
+    dispatch_notifications([(url, messages) for url in server_chan_urls_list])
+
+
+def retry_pending_notifications(server_chan_urls_list):
+    """补发投递日志中上次失败的消息 (无需重新抓取)；已不在 URL 列表中的接收者直接丢弃。"""
+    log = load_delivery_log()
+    if not server_chan_urls_list or not log["pending"]:
+        return
+    urls_by_id = {get_recipient_id(url): url for url in server_chan_urls_list}
+    jobs = [(urls_by_id[recipient_id], messages) for recipient_id, messages in log["pending"].items() if recipient_id in urls_by_id]
+    stale = [recipient_id for recipient_id in log["pending"] if recipient_id not in urls_by_id]
+    if stale:
+        for recipient_id in stale:
+            del log["pending"][recipient_id]
+        save_delivery_log(log)
+    if jobs:
+        print(f"[*] 补发 {len(jobs)} 个接收者上次未送达的消息...")
+        dispatch_notifications(jobs, retry=True)
 
 
 def get_old_data_from_repo(file_path):
@@ -139,20 +437,14 @@ def get_old_data_from_repo(file_path):
         return []
 
 
-def commit_new_state(new_data_list, file_path):
+def commit_new_state(new_state, file_path):
     """
-    将新数据写入本地状态文件，供 git-auto-commit-action 统一提交。
+    将新状态 (差异索引) 写入本地状态文件，供 git-auto-commit-action 统一提交。
     (注意：此函数仅写入本地文件，不再通过 PyGithub API 远程提交，以避免与 Actions 冲突)
     """
-    new_data_content = json.dumps(new_data_list, ensure_ascii=False, indent=4)
-    
-    # 1. 确保目录存在 (os.makedirs 是幂等的)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # 2. 将新状态数据写入本地文件
+    # 将新状态数据写入本地文件 (原子替换，目录不存在时自动创建)
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_data_content)
+        write_json_atomic(file_path, new_state, indent=4)
         # 打印信息用于日志确认
         print(f"[+] 新状态数据已写入本地文件: {file_path}")
         print(f"[*] 注意：文件 {file_path} 将由后续的 git-auto-commit-action 统一提交和推送。")
@@ -161,133 +453,440 @@ def commit_new_state(new_data_list, file_path):
         # 如果本地写入失败，则后续的 git-auto-commit-action 将无法提交此文件
 
 
-def compare_data_and_generate_report(new_data, old_data):
-    """对比新旧数据，返回新增和删除的列表"""
-    old_ids = {item['id'] for item in old_data if 'id' in item}
-    new_ids = {item['id'] for item in new_data if 'id' in item}
-    
-    added_ids = new_ids - old_ids
-    removed_ids = old_ids - new_ids
-    
-    new_data_map = {item['id']: item for item in new_data if 'id' in item}
-    old_data_map = {item['id']: item for item in old_data if 'id' in item}
-    
-    added_items = [new_data_map[id] for id in added_ids]
-    removed_items = [old_data_map[id] for id in removed_ids]
-    
-    return added_items, removed_items
+def diff_fields_hash(item):
+    """关键字段 (DIFF_FIELDS) 的内容哈希。"""
+    values = [item.get(field) for field in DIFF_FIELDS]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
 
 
-def format_markdown_report(added_items, removed_items):
-    """格式化 Server 酱的 Markdown 内容，包含项目名称、日期和新格式链接"""
-    # 确保 BASE_URL 在此作用域内可用，因为它在文件顶部是全局定义的
-    global BASE_URL
-    
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    report_content = f"## 所有招采->正在招标->北京\n"
-    report_content += f"**时间：** {now_str}\n"
-    report_content += f"**总计记录：** {len(added_items) + len(removed_items)} 条变动\n\n"
-    
-    # 辅助函数：生成单个条目的 Markdown 内容
-    def format_item_details(item):
-        # 从字典中安全获取所需字段
-        link_id = item.get('id', '')
-        link_uuid = item.get('uuid', '')
-        link_publish_type = item.get('publishType', '')
-        link_publish_one_type = item.get('publishOneType', '')
-        
-        # 构造用户指定的新格式 URL
-        link = f'{BASE_URL}/#/noticeDetail?publishId={link_id}&publishUuid={link_uuid}&publishType={link_publish_type}&publishOneType={link_publish_one_type}'
-        
-        # 格式化输出内容
-        item_md = ""
-        item_md += f"> - **标题:** {item.get('name', 'N/A')}\n"
-        item_md += f"> - **发布时间:** {item.get('publishDate', 'N/A')}\n"
-        item_md += f"> - **文件售卖截止时间:** {item.get('tenderSaleDeadline', 'N/A')}\n"
-        item_md += f"> - **公示截止时间:** {item.get('publicityEndTime', 'N/A')}\n"
-        item_md += f"> - **截标时间:** {item.get('backDate', 'N/A')}\n"
+def build_index_entry(item):
+    """差异索引条目：内容哈希 + 关键字段和链接字段 (用于报告修改前的值和删除条目)。"""
+    fields = {field: item.get(field) for field in list(DIFF_FIELDS) + LINK_FIELDS}
+    return {"hash": diff_fields_hash(item), "fields": fields}
+
+
+def get_diff_index_path(task_key):
+    # 差异索引：id -> 内容哈希及关键字段，例如 zgyd/task_3_index.json
+    return os.path.join(OUTPUT_DIR, f"{task_key.lower()}_index.json")
+
+
+def get_legacy_state_path(task_key):
+    # 旧版状态文件 (完整快照)，例如 zgyd/task_3_state.json：仅用于首次迁移到差异索引
+    return os.path.join(OUTPUT_DIR, f"{task_key.lower()}_state.json")
+
+
+def get_notify_label(task_key):
+    """推送消息标题前缀：notify 为字符串时使用该字符串，否则使用数据集名称。"""
+    config = TASK_CONFIG[task_key]
+    return config["notify"] if isinstance(config.get("notify"), str) else config["name"]
+
+
+def load_diff_index(task_key):
+    """
+    读取任务的差异索引 {id: 索引条目}。
+    索引不存在时，若存在旧版完整快照 (例如 task_3_state.json)，则由其一次性生成索引。
+    """
+    old_index = get_old_data_from_repo(get_diff_index_path(task_key))
+    if isinstance(old_index, dict) and old_index:
+        return old_index
+    legacy_path = get_legacy_state_path(task_key)
+    old_data = get_old_data_from_repo(legacy_path)
+    if old_data:
+        print(f"[*] 由旧版状态文件 {legacy_path} 生成差异索引。")
+    return {item['id']: build_index_entry(item) for item in old_data if 'id' in item}
+
+
+def compare_data_and_generate_report(new_data, old_index):
+    """
+    单次遍历新数据，与持久化的差异索引对比，返回 (新增, 删除, 修改, 新索引)。
+    修改条目为 {"item": 新记录, "changes": [(字段, 修改前, 修改后), ...]}；
+    删除条目由索引中保存的字段还原，无需加载旧的完整快照。
+    """
+    added_items = []
+    modified_items = []
+    new_index = {}
+
+    for item in new_data:
+        if 'id' not in item or item['id'] in new_index:
+            continue
+        entry = build_index_entry(item)
+        new_index[item['id']] = entry
+        old_entry = old_index.get(item['id'])
+        if old_entry is None:
+            added_items.append(item)
+        elif old_entry["hash"] != entry["hash"]:
+            changes = [
+                (field, old_entry["fields"].get(field), item.get(field))
+                for field in DIFF_FIELDS if old_entry["fields"].get(field) != item.get(field)
+            ]
+            modified_items.append({"item": item, "changes": changes})
+
+    removed_items = [entry["fields"] for item_id, entry in old_index.items() if item_id not in new_index]
+
+    return added_items, removed_items, modified_items, new_index
+
+
+def format_item_details(item):
+    """生成单个条目的 Markdown 内容"""
+    # 构造用户指定的新格式 URL
+    link = f"{BASE_URL}/#/noticeDetail?publishId={item.get('id', '')}&publishUuid={item.get('uuid', '')}&publishType={item.get('publishType', '')}&publishOneType={item.get('publishOneType', '')}"
+    # 已缓存的详情字段 (预算、采购方式、联系人等)
+    detail_lines = [f"> - **{label}:** {value}\n" for label, value in load_detail_summary(item.get('uuid')).items()]
+    return "".join([
+        f"> - **标题:** {item.get('name', 'N/A')}\n",
+        f"> - **发布时间:** {item.get('publishDate', 'N/A')}\n",
+        f"> - **文件售卖截止时间:** {item.get('tenderSaleDeadline', 'N/A')}\n",
+        f"> - **公示截止时间:** {item.get('publicityEndTime', 'N/A')}\n",
+        f"> - **截标时间:** {item.get('backDate', 'N/A')}\n",
+        *detail_lines,
         # 链接文本统一为“点击查看”
-        item_md += f"> - **详情链接:** [点击查看]({link})\n\n"
-        return item_md
+        f"> - **详情链接:** [点击查看]({link})\n\n",
+    ])
 
-    if added_items:
-        report_content += f"### [+] 新增条目 ({len(added_items)}): \n"
-        for item in added_items:
-            report_content += format_item_details(item)
 
+def build_report_sections(task_key, added_items, removed_items, modified_items=()):
+    """
+    生成报告的各个组成部分：(头部, [(分组标题, [条目块, ...]), ...], 尾部)。
+    条目块是拆分消息时的最小单位，同一条目不会被拆到两条消息中。
+    """
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    header = "".join([
+        f"## {TASK_CONFIG[task_key]['name'].replace('_', '->')}\n",
+        f"**时间：** {now_str}\n",
+        f"**总计记录：** {len(added_items) + len(removed_items) + len(modified_items)} 条变动\n\n",
+    ])
+
+    sections = []
+    if added_items:
+        sections.append((f"### [+] 新增条目 ({len(added_items)}): \n", [format_item_details(item) for item in added_items]))
+    if modified_items:
+        # 先列出字段级的修改前后对比，再展示修改后的完整条目
+        sections.append((f"### [*] 修改条目 ({len(modified_items)}): \n", [
+            "".join([f"> - **{DIFF_FIELDS[field]}变更:** ~~{before}~~ → {after}\n" for field, before, after in modified["changes"]])
+            + format_item_details(modified["item"])
+            for modified in modified_items
+        ]))
     if removed_items:
-        report_content += f"### [-] 删除/失效条目 ({len(removed_items)}): \n"
-        for item in removed_items:
-            report_content += format_item_details(item) # 仍使用相同格式展示历史数据
+        # 仍使用相同格式展示历史数据
+        sections.append((f"### [-] 删除/失效条目 ({len(removed_items)}): \n", [format_item_details(item) for item in removed_items]))
+
+    return header, sections, build_report_footer()
 
-    # 添加 Actions 日志链接 (保持不变)
+
+def build_report_footer():
+    """报告尾部：Actions 运行日志链接。"""
     run_url = f"{os.environ.get('GITHUB_SERVER_URL', '')}/{os.environ.get('GITHUB_REPOSITORY', '')}/actions/runs/{os.environ.get('GITHUB_RUN_ID', '')}"
-    report_content += f"\n---\n[查看完整运行日志]({run_url})"
-    
-    return report_content
+    return f"\n---\n[查看完整运行日志]({run_url})"
+
+
+def format_markdown_report(task_key, added_items, removed_items, modified_items=()):
+    """格式化 Server 酱的 Markdown 内容，包含项目名称、日期和新格式链接"""
+    header, sections, footer = build_report_sections(task_key, added_items, removed_items, modified_items)
+    parts = [header]
+    for title, blocks in sections:
+        parts.append(title)
+        parts.extend(blocks)
+    parts.append(footer)
+    return "".join(parts)
+
+
+def split_markdown_report(task_key, added_items, removed_items, modified_items=(), max_bytes=None):
+    """将变动报告按条目边界拆分为多条消息 (见 split_report_sections)。"""
+    return split_report_sections(*build_report_sections(task_key, added_items, removed_items, modified_items), max_bytes=max_bytes)
+
+
+def split_report_sections(header, sections, footer, max_bytes=None):
+    """
+    将报告按条目边界拆分为多条不超过 max_bytes (UTF-8 字节) 的消息。
+    每条消息都带有报告头部和尾部，跨消息的分组会在下一条消息中重复分组标题并注明 (续)。
+    """
+    max_bytes = max_bytes or NOTIFY_MAX_MESSAGE_BYTES
+    size = lambda text: len(text.encode("utf-8"))
+    base_size = size(header) + size(footer)
+
+    messages = []
+    parts, used = [header], base_size
+    for title, blocks in sections:
+        current_title = title
+        for block in blocks:
+            title_size = size(current_title) if current_title else 0
+            # 当前消息放不下：先结束当前消息 (单个条目超限时仍独占一条消息)
+            if len(parts) > 1 and used + title_size + size(block) > max_bytes:
+                parts.append(footer)
+                messages.append("".join(parts))
+                parts, used = [header], base_size
+                current_title = current_title or title.replace(": \n", " (续): \n")
+                title_size = size(current_title)
+            if current_title:
+                parts.append(current_title)
+                used += title_size
+                current_title = None
+            parts.append(block)
+            used += size(block)
+    parts.append(footer)
+    messages.append("".join(parts))
+    return messages
 
 
 # --- MAIN CRAWLER LOGIC ---
 
-def scrape_content(payload_override, output_name):
-    """执行抓取操作，返回抓取到的所有数据和成功状态。"""
+def build_payload(payload_override):
+    """合并基础请求参数与任务参数。"""
     base_payload = {
         "size": 100, "current": 1, "companyType": "", "name": "",
         "publishType": "PROCUREMENT", "publishOneType": "PROCUREMENT",
         "homePageQueryType": "", "sfactApplColumn5": "PC"
     }
-
     payload = base_payload.copy()
     payload.update(payload_override)
-    page_size = payload['size']
-    current_page = payload['current']
-    all_content = []
+    return payload
 
-    session = requests.Session()
-    session.mount('https://', CustomHttpAdapter())
 
-    print(f"[{output_name}] 开始抓取数据...")
+def fetch_page(session, payload, page, retries=MAX_RETRIES, telemetry=None):
+    """抓取指定页，返回解析后的 JSON (限速、重试和指标记录见 post_json)。"""
+    return post_json(session, POST_URL, dict(payload, current=page), f"第 {page} 页", page, retries, telemetry, count_records=lambda response_json: len(get_page_content(response_json)))
 
-    success = True
-    while True:
-        payload['current'] = current_page
-        headers = get_random_headers()
 
+def post_json(session, url, body, label, page=None, retries=MAX_RETRIES, telemetry=None, count_records=None):
+    """
+    POST 请求并返回解析后的 JSON。每次请求前由全局 rate_controller 控制节奏，请求结果反馈给它调整速率。
+    网络错误或 JSON 解析错误按带抖动的指数退避重试 retries 次，仍失败时抛出，由调用方处理。
+    传入 telemetry 时每次请求 (含重试) 都以 page 为序号记录一条指标，等待时间包含限速等待和重试退避。
+    """
+    backoff = 0.0
+    for attempt in range(retries + 1):
+        waited = backoff + rate_controller.wait()
+        started = time.monotonic()
+        status, size, response = None, 0, None
         try:
-            print(f"[{output_name}] 正在抓取第 {current_page} 页...")
-            response = session.post(POST_URL, headers=headers, json=payload, timeout=15)
+            response = session.post(url, headers=get_random_headers(), json=body, timeout=15)
+            status, size = response.status_code, len(response.content)
             response.raise_for_status()
             response_json = response.json()
+            latency = time.monotonic() - started
+            rate_controller.feedback(latency, status)
+            if telemetry:
+                telemetry.record(page, attempt, status, latency, size, waited, records=count_records(response_json) if count_records else None)
+            return response_json
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            latency = time.monotonic() - started
+            rate_controller.feedback(latency, status, type(e).__name__, parse_retry_after(response) if response is not None else None)
+            if telemetry:
+                telemetry.record(page, attempt, status, latency, size, waited, error=type(e).__name__)
+            if attempt >= retries:
+                raise
+            backoff = RETRY_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+            print(f"[*] {label}请求失败 ({e})，{backoff:.1f} 秒后进行第 {attempt + 1}/{retries} 次重试 (当前速率 {rate_controller.report()})...")
+            time.sleep(backoff)
 
-            page_content = response_json.get('data', {}).get('content', [])
-            content_count = len(page_content)
 
-            if not page_content:
-                print(f"[{output_name}] 第 {current_page} 页无内容。抓取停止。")
-                break
+def get_page_content(response_json):
+    return (response_json.get('data') or {}).get('content') or []
 
-            all_content.extend(page_content)
 
-            if content_count < page_size:
-                print(f"[{output_name}] 已达到最后一页。总计 {len(all_content)} 条记录。")
-                break
+def get_total_count(response_json):
+    """从响应中读取记录总数，接口未返回时为 None。"""
+    data = response_json.get('data') or {}
+    for key in ('totalElements', 'total', 'totalCount'):
+        value = data.get(key)
+        if isinstance(value, int) and value >= 0:
+            return value
+    return None
 
-            current_page += 1
-            time.sleep(random.uniform(2, 5))
 
-        except requests.exceptions.RequestException as e:
-            print(f"[{output_name}] 请求第 {current_page} 页时发生错误: {e}")
-            success = False
-            break
-        except json.JSONDecodeError:
-            print(f"[{output_name}] 无法解析 JSON 响应。")
-            success = False
-            break
+def merge_pages(pages):
+    """按页码顺序拼接各页内容，并按 id 去重 (翻页期间新增记录会把旧记录挤到下一页)。"""
+    all_content = []
+    seen_ids = set()
+    for page in sorted(pages):
+        for item in pages[page]:
+            item_id = item.get('id')
+            if item_id is not None:
+                if item_id in seen_ids:
+                    continue
+                seen_ids.add(item_id)
+            all_content.append(item)
+    return all_content
+
+
+class ListSink:
+    """在内存中收集记录 (默认 sink，适用于小数据集)。"""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, item):
+        self.records.append(item)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+class NdjsonSink:
+    """
+    将记录逐条追加到 NDJSON 临时文件，内存占用与数据集大小无关。
+    可重复迭代 (每次从文件重新读取)，用完后调用 discard() 删除临时文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, item):
+        self._file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def __iter__(self):
+        if not self._file.closed:
+            self._file.close()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __len__(self):
+        return self.count
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PageAssembler:
+    """
+    按页码顺序把页面内容交给 sink，并按 id 去重：乱序到达的页面先暂存，前面的页面到齐后再交付；
+    已交付的页面不再保留在内存中，只记录每页条数。
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.page_lengths = {}
+        self._next_page = 1
+        self._buffer = {}
+        self._seen_ids = set()
+
+    def __contains__(self, page):
+        return page in self.page_lengths
+
+    def page_length(self, page):
+        return self.page_lengths.get(page, 0)
+
+    def add(self, page, content):
+        self.page_lengths[page] = len(content)
+        self._buffer[page] = content
+        while self._next_page in self._buffer:
+            self._emit(self._buffer.pop(self._next_page))
+            self._next_page += 1
+
+    def finish(self):
+        """交付剩余的暂存页面 (中间有失败页时仍按页码顺序)，返回 sink。"""
+        for page in sorted(self._buffer):
+            self._emit(self._buffer[page])
+        self._buffer = {}
+        return self.sink
+
+    def _emit(self, content):
+        for item in content:
+            item_id = item.get('id')
+            if item_id is not None:
+                if item_id in self._seen_ids:
+                    continue
+                self._seen_ids.add(item_id)
+            self.sink.write(item)
+
+
+class PageCheckpoint:
+    """
+    抓取断点：已抓取的页面逐页追加写入 zgyd/<数据集>.checkpoint.ndjson (首行为请求参数)。
+    抓取失败后，下次运行若请求参数一致且断点未过期，则跳过已抓取的页面 (第 1 页总是重新抓取)。
+    断点文件不提交到仓库，保存在 Actions 缓存中；抓取成功后清空文件 (而非删除)，
+    缓存才会以空文件覆盖旧断点，否则下次运行会恢复到更早的断点。
+    """
+
+    def __init__(self, output_name, payload):
+        self.path = os.path.join(OUTPUT_DIR, f"{output_name}.checkpoint.ndjson")
+        self.payload = {key: value for key, value in payload.items() if key != 'current'}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def load(self):
+        """读取断点中的页面 {页码: 内容}；参数不一致、已过期或损坏时返回空字典。"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return {}
+        pages = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                if header.get('payload') != self.payload or time.time() - header.get('created_at', 0) > CHECKPOINT_MAX_AGE_HOURS * 3600:
+                    return {}
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        pages[entry['page']] = entry['content']
+        except (ValueError, KeyError) as e:
+            # 最后一行可能因中断而不完整，保留已解析的页面
+            print(f"[-] 断点文件 {self.path} 部分损坏: {e}")
+        self._started = True
+        return pages
 
-    final_count = len(all_content)
+    def append(self, page, content):
+        with self._lock:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            mode = 'a' if self._started else 'w'
+            with open(self.path, mode, encoding='utf-8') as f:
+                if not self._started:
+                    f.write(json.dumps({"payload": self.payload, "created_at": time.time()}, ensure_ascii=False) + "\n")
+                    self._started = True
+                f.write(json.dumps({"page": page, "content": content}, ensure_ascii=False) + "\n")
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                open(self.path, 'w').close()
+            self._started = False
+
+
+def scrape_content(payload_override, output_name, session=None, max_workers=MAX_WORKERS, sink=None, telemetry=None):
+    """
+    执行抓取操作，返回抓取到的所有数据和成功状态。失败时已抓取的页面保留在断点文件中，下次运行可续抓。
+    传入 sink (如 NdjsonSink) 时，页面按顺序流式写入 sink 而不在内存中累积，返回值中的数据即该 sink。
+    传入 telemetry (CrawlTelemetry) 时记录逐请求指标。
+    """
+    payload = build_payload(payload_override)
+
+    if session is None:
+        session = create_session(max_workers)
+
+    checkpoint = PageCheckpoint(output_name, payload)
+    resumed_pages = checkpoint.load()
+    if resumed_pages:
+        print(f"[{output_name}] 从断点恢复 {len(resumed_pages)} 页，跳过这些页面。")
+
+    assembler = PageAssembler(sink if sink is not None else ListSink())
+
+    print(f"[{output_name}] 开始抓取数据...")
+
+    if max_workers > 1:
+        success = scrape_pages_concurrently(session, payload, output_name, max_workers, assembler, resumed_pages, checkpoint, telemetry)
+    else:
+        # 第 1 页总是重新抓取，断点中的第 1 页可能已经过时
+        for page, content in resumed_pages.items():
+            if page > 1:
+                assembler.add(page, content)
+        success = scrape_pages_sequentially(session, payload, output_name, assembler, checkpoint=checkpoint, telemetry=telemetry)
+
+    result = assembler.finish()
+    all_content = result.records if sink is None else result
+    final_count = len(result)
 
     if success and final_count > 0:
+        checkpoint.clear()
         print(f"[{output_name}] 抓取完成。总计记录: {final_count} 条。")
         return all_content, True
     else:
@@ -295,83 +894,1431 @@ def scrape_content(payload_override, output_name):
         return all_content, False
 
 
-# 定义时区常量
-CST_TZ = pytz.timezone('Asia/Shanghai')
+def scrape_pages_sequentially(session, payload, output_name, assembler, start_page=None, checkpoint=None, telemetry=None):
+    """逐页串行抓取，直到遇到空页或不满一页；assembler 中已有的页面 (断点恢复) 不再请求。返回是否成功。"""
+    page_size = payload['size']
+    current_page = start_page or payload['current']
 
+    while True:
+        try:
+            if current_page in assembler:
+                content_count = assembler.page_length(current_page)
+            else:
+                print(f"[{output_name}] 正在抓取第 {current_page} 页...")
+                page_content = get_page_content(fetch_page(session, payload, current_page, telemetry=telemetry))
+                content_count = len(page_content)
+                if page_content:
+                    assembler.add(current_page, page_content)
+                    if checkpoint:
+                        checkpoint.append(current_page, page_content)
 
-def run_crawler_job(task_key):
-    if task_key not in TASK_CONFIG:
-        print(f"错误：无效的任务键 '{task_key}'。")
-        return
+            if not content_count:
+                print(f"[{output_name}] 第 {current_page} 页无内容。抓取停止。")
+                return True
 
-    config = TASK_CONFIG[task_key]
-    task_name = config["name"]
-    output_path = os.path.join(OUTPUT_DIR, f"{task_name}.json")
+            if content_count < page_size:
+                print(f"[{output_name}] 已达到最后一页。")
+                return True
 
-    print(f"==================================================")
-    print(f"任务键: {task_key}，目标数据集: {task_name}")
-    print(f"==================================================")
+            current_page += 1
+
+        except requests.exceptions.RequestException as e:
+            print(f"[{output_name}] 请求第 {current_page} 页时发生错误: {e}")
+            return False
+        except json.JSONDecodeError:
+            print(f"[{output_name}] 无法解析 JSON 响应。")
+            return False
 
-    new_data, success = scrape_content(config["payload"], task_name)
 
-    if not success:
-        print("抓取失败，跳过文件保存和元数据更新。")
-        return
+def scrape_pages_concurrently(session, payload, output_name, max_workers, assembler, resumed_pages=None, checkpoint=None, telemetry=None):
+    """
+    并发分页抓取：先抓第 1 页读取总数，再由线程池并发抓取其余页面 (跳过断点中已有的页面)。
+    所有请求共享全局 rate_controller 的速率预算；页面经 assembler 按页码顺序交付；
+    单页失败不会丢弃其他已成功的页面，失败页会在最后串行重试一次。返回是否成功。
+    """
+    page_size = payload['size']
+    resumed_pages = resumed_pages or {}
 
-    # --- 核心逻辑分支：TASK_3 的差异化推送与状态管理 ---
-    if task_key == "TASK_3":
-        
-        # 1. 获取旧数据 (从本地文件)
-        #    (该文件由上一次 Action 运行时的 git-auto-commit 提交)
-        old_data = get_old_data_from_repo(TASK_3_STATE_PATH)
-        
-        # 2. 对比数据
-        added_items, removed_items = compare_data_and_generate_report(new_data, old_data)
-        
-        # 3. 报告并推送 (仅在有变动时)
-        if added_items or removed_items:
-            print(f"发现变动：新增 {len(added_items)} 条, 删除 {len(removed_items)} 条。")
+    # 第 1 页总是重新抓取，以获得最新的总数
+    try:
+        print(f"[{output_name}] 正在抓取第 1 页...")
+        first_json = fetch_page(session, payload, 1, telemetry=telemetry)
+    except requests.exceptions.RequestException as e:
+        print(f"[{output_name}] 请求第 1 页时发生错误: {e}")
+        return False
+    except json.JSONDecodeError:
+        print(f"[{output_name}] 无法解析 JSON 响应。")
+        return False
 
-            # 检查 Server Chan URL 是否存在
-            server_chan_urls_str = os.environ.get("WECHAT_WEBHOOK_URL")
-            server_chan_url_list = parse_server_chan_urls(server_chan_urls_str)
+    first_content = get_page_content(first_json)
+    if not first_content:
+        print(f"[{output_name}] 第 1 页无内容。抓取停止。")
+        return True
+    assembler.add(1, first_content)
+    if len(first_content) < page_size:
+        print(f"[{output_name}] 已达到最后一页。")
+        return True
+    if checkpoint:
+        checkpoint.append(1, first_content)
 
-            if not server_chan_url_list:
-                print("[-] 环境变量 WECHAT_WEBHOOK_URL 为空，跳过 Server Chan 推送。")
-            else:
-                # 生成 Markdown 报告
-                report_content = format_markdown_report(added_items, removed_items)
-                # 调用推送函数
-                send_server_chan_notification(server_chan_url_list, report_content)
+    total = get_total_count(first_json)
+    total_pages = math.ceil(total / page_size) if total is not None else None
+    for page in sorted(resumed_pages):
+        if 1 < page and (total_pages is None or page <= total_pages):
+            assembler.add(page, resumed_pages[page])
 
-            # 4. 提交新状态数据 (写入本地文件，由 git-auto-commit-action 提交)
-            commit_new_state(new_data, TASK_3_STATE_PATH)
-            
-        else:
-            print("数据无变化，跳过推送和状态更新。")
+    if total is None:
+        print(f"[{output_name}] 响应中没有总数字段，退回串行抓取。")
+        return scrape_pages_sequentially(session, payload, output_name, assembler, start_page=2, checkpoint=checkpoint, telemetry=telemetry)
 
-    # --- 通用逻辑：写入本地 JSON 文件 (供 Streamlit 读取) ---
-    # TASK_3 的数据写入本地文件，Task 1/2/3 都需要写入，由 git-auto-commit-action 统一提交
-    try:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        # TASK_3 写入 zgyd/所有招采_正在招标_北京.json
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(new_data, f, indent=4, ensure_ascii=False)
-        print(f"已将新数据写入本地文件: {output_path}")
-    except Exception as e:
-        print(f"写入本地 JSON 文件失败: {e}")
-        
-    # --- 通用逻辑：更新元数据 (用于 Streamlit 显示更新时间) ---
-    metadata = load_metadata()
-    now_cst = datetime.now(CST_TZ)
-    metadata[task_name] = now_cst.strftime("%Y-%m-%d %H:%M:%S")
-    save_metadata(metadata)
-    print(f"元数据已更新。")
+    pending_pages = [page for page in range(2, total_pages + 1) if page not in assembler]
+    print(f"[{output_name}] 共 {total} 条记录，{total_pages} 页 (待抓取 {len(pending_pages)} 页)，使用 {max_workers} 个线程并发抓取 (当前速率 {rate_controller.report()})。")
 
+    def fetch_with_budget(page):
+        page_content = get_page_content(fetch_page(session, payload, page, telemetry=telemetry))
+        if checkpoint and page_content:
+            checkpoint.append(page, page_content)
+        return page_content
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        task_key_to_run = sys.argv[1]
-        run_crawler_job(task_key_to_run)
+    failed_pages = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_with_budget, page): page for page in pending_pages}
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                assembler.add(page, future.result())
+                print(f"[{output_name}] 第 {page}/{total_pages} 页完成 ({assembler.page_length(page)} 条)。")
+            except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                print(f"[{output_name}] 请求第 {page} 页时发生错误: {e}")
+                failed_pages.append(page)
+
+    success = True
+    for page in sorted(failed_pages):
+        try:
+            print(f"[{output_name}] 重试第 {page} 页...")
+            assembler.add(page, fetch_with_budget(page))
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            print(f"[{output_name}] 第 {page} 页重试失败: {e}")
+            success = False
+
+    # 抓取期间总数增长时，最后一页可能仍是满页，继续串行补抓剩余页面
+    if success and assembler.page_length(total_pages) == page_size:
+        print(f"[{output_name}] 最后一页仍为满页，继续串行抓取后续页面...")
+        return scrape_pages_sequentially(session, payload, output_name, assembler, start_page=total_pages + 1, checkpoint=checkpoint, telemetry=telemetry)
+
+    return success
+
+
+# --- CRAWL TELEMETRY ---
+
+class CrawlTelemetry:
+    """
+    单次抓取的逐请求指标 (线程安全)：页码、重试序号、状态码、延迟、响应字节数、本页记录数、请求前等待时间和错误类型。
+    finish() 时汇总为一条运行记录，追加写入 CRAWL_METRICS_PATH。
+    """
+
+    def __init__(self, task, mode):
+        self.task = task
+        self.mode = mode
+        self.started_at = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self.requests = []
+
+    def record(self, page, attempt, status, latency, size, waited=0.0, records=None, error=None):
+        entry = {
+            "page": page, "attempt": attempt, "status": status, "latency_ms": round(latency * 1000, 1),
+            "bytes": size, "records": records, "sleep_ms": round(waited * 1000, 1), "error": error,
+        }
+        with self._lock:
+            self.requests.append(entry)
+
+    def summary(self, success, record_count):
+        with self._lock:
+            requests_list = list(self.requests)
+        latencies = sorted(entry["latency_ms"] for entry in requests_list)
+        percentile = lambda q: latencies[int(q * (len(latencies) - 1))] if latencies else None
+        errors = sum(1 for entry in requests_list if entry["error"])
+        page_records = [entry["records"] for entry in requests_list if entry["records"] is not None]
+        status_counts = {}
+        for entry in requests_list:
+            key = str(entry["status"] or entry["error"])
+            status_counts[key] = status_counts.get(key, 0) + 1
+        return {
+            "time": self.started_at,
+            "task": self.task,
+            "mode": self.mode,
+            "success": success,
+            "duration_s": round(time.monotonic() - self._started, 2),
+            "records": record_count,
+            "requests": len(requests_list),
+            "errors": errors,
+            "error_rate": round(errors / len(requests_list), 4) if requests_list else 0.0,
+            "retries": sum(1 for entry in requests_list if entry["attempt"] > 0),
+            "bytes": sum(entry["bytes"] for entry in requests_list),
+            "records_per_page": round(sum(page_records) / len(page_records), 1) if page_records else 0.0,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": latencies[-1] if latencies else None,
+            "sleep_s": round(sum(entry["sleep_ms"] for entry in requests_list) / 1000, 2),
+            "rate_rps": round(rate_controller.rate, 2),
+            "status": status_counts,
+        }
+
+    def finish(self, success, record_count):
+        """写入本次运行的汇总 (以及可选的逐请求日志)；指标写入失败不影响抓取结果。"""
+        summary = self.summary(success, record_count)
+        print(f"[{self.task}] 抓取指标：{summary['requests']} 次请求，错误率 {summary['error_rate']:.1%}，耗时 {summary['duration_s']} 秒，等待 {summary['sleep_s']} 秒，当前速率 {rate_controller.report()}。")
+        try:
+            append_crawl_metrics(summary)
+            if CRAWL_REQUEST_LOG:
+                with open(CRAWL_REQUEST_LOG, 'a', encoding='utf-8') as f:
+                    for entry in self.requests:
+                        f.write(json.dumps(dict(entry, task=self.task, run=self.started_at), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[-] 写入抓取指标失败: {e}")
+        return summary
+
+
+def append_crawl_metrics(summary):
+    """追加一条运行汇总；文件超过 CRAWL_METRICS_MAX_BYTES 时先轮转为 .1 文件。"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if os.path.exists(CRAWL_METRICS_PATH) and os.path.getsize(CRAWL_METRICS_PATH) >= CRAWL_METRICS_MAX_BYTES:
+        os.replace(CRAWL_METRICS_PATH, get_rotated_metrics_path())
+    with open(CRAWL_METRICS_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+
+def get_rotated_metrics_path():
+    root, ext = os.path.splitext(CRAWL_METRICS_PATH)
+    return f"{root}.1{ext}"
+
+
+# --- HISTORY STORE (SQLite) ---
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    task TEXT NOT NULL,
+    id TEXT NOT NULL,
+    publish_date TEXT,
+    company_type_name TEXT,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    removed_at TEXT,
+    PRIMARY KEY (task, id)
+);
+CREATE INDEX IF NOT EXISTS idx_records_id ON records (id);
+CREATE INDEX IF NOT EXISTS idx_records_publish_date ON records (task, publish_date);
+CREATE INDEX IF NOT EXISTS idx_records_company_type_name ON records (task, company_type_name);
+
+-- 只追加：记录每个内容版本
+CREATE TABLE IF NOT EXISTS record_versions (
+    task TEXT NOT NULL,
+    id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    seen_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_record_versions_id ON record_versions (task, id);
+
+-- 只追加：每次运行的汇总
+CREATE TABLE IF NOT EXISTS runs (
+    task TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_task ON runs (task, run_at);
+
+-- 仍在线的记录 last_seen 即该任务最近一次运行时间，无需每次运行逐条更新
+CREATE VIEW IF NOT EXISTS record_history AS
+SELECT r.task, r.id, r.publish_date, r.company_type_name, r.first_seen,
+       CASE WHEN r.removed_at IS NULL THEN (SELECT MAX(run_at) FROM runs WHERE runs.task = r.task) ELSE r.last_seen END AS last_seen,
+       r.removed_at, r.data
+FROM records r;
+"""
+
+
+def open_history_store():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    conn = sqlite3.connect(HISTORY_DB_PATH, timeout=HISTORY_DB_TIMEOUT)
+    conn.executescript(HISTORY_SCHEMA)
+    return conn
+
+
+def content_hash(item):
+    """记录内容哈希 (忽略 VOLATILE_FIELDS)，用于判断记录是否被修改。"""
+    stable = {key: value for key, value in item.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(stable, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def record_history(conn, task_key, records, seen_at):
+    """
+    将本次抓取结果写入历史库，只对变化的记录产生写入：
+    新记录插入 (first_seen)，内容变化或重新出现的记录更新并追加版本，
+    本次未出现的在线记录标记 removed_at (last_seen 取上一次运行时间)。
+    返回 (新增, 修改, 删除) 条数。
+    """
+    previous_run = conn.execute("SELECT MAX(run_at) FROM runs WHERE task = ?", (task_key,)).fetchone()[0]
+    existing = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute("SELECT id, content_hash, removed_at FROM records WHERE task = ?", (task_key,))
+    }
+
+    added = changed = 0
+    current_ids = set()
+    with conn:
+        for item in records:
+            item_id = item.get('id')
+            if item_id is None or item_id in current_ids:
+                continue
+            current_ids.add(item_id)
+            item_hash = content_hash(item)
+            previous = existing.get(item_id)
+            if previous is not None and previous[0] == item_hash and previous[1] is None:
+                continue
+
+            data = json.dumps(item, ensure_ascii=False)
+            if previous is None:
+                added += 1
+                conn.execute(
+                    "INSERT INTO records (task, id, publish_date, company_type_name, content_hash, data, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task_key, item_id, item.get('publishDate'), item.get('companyTypeName'), item_hash, data, seen_at, seen_at),
+                )
+            else:
+                changed += 1
+                conn.execute(
+                    "UPDATE records SET publish_date = ?, company_type_name = ?, content_hash = ?, data = ?, last_seen = ?, removed_at = NULL "
+                    "WHERE task = ? AND id = ?",
+                    (item.get('publishDate'), item.get('companyTypeName'), item_hash, data, seen_at, task_key, item_id),
+                )
+            if previous is None or previous[0] != item_hash:
+                conn.execute(
+                    "INSERT INTO record_versions (task, id, content_hash, data, seen_at) VALUES (?, ?, ?, ?, ?)",
+                    (task_key, item_id, item_hash, data, seen_at),
+                )
+
+        removed_ids = [item_id for item_id, (_, removed_at) in existing.items() if removed_at is None and item_id not in current_ids]
+        conn.executemany(
+            "UPDATE records SET removed_at = ?, last_seen = ? WHERE task = ? AND id = ?",
+            [(seen_at, previous_run or seen_at, task_key, item_id) for item_id in removed_ids],
+        )
+        conn.execute(
+            "INSERT INTO runs (task, run_at, total, added, changed, removed) VALUES (?, ?, ?, ?, ?, ?)",
+            (task_key, seen_at, len(current_ids), added, changed, len(removed_ids)),
+        )
+
+    return added, changed, len(removed_ids)
+
+
+def export_snapshot(conn, task_key):
+    """从历史库逐条导出当前在线的记录 (按 id 升序，与快照文件的顺序一致)，作为 JSON 数据集的内容。"""
+    rows = conn.execute(
+        "SELECT data FROM records WHERE task = ? AND removed_at IS NULL ORDER BY id",
+        (task_key,),
+    )
+    for row in rows:
+        yield json.loads(row[0])
+
+
+# --- COLUMNAR DATASET (Parquet) ---
+
+def get_columnar_path(task_name):
+    return os.path.join(OUTPUT_DIR, f"{task_name}.parquet")
+
+
+def read_columnar_version(task_name):
+    """Parquet 文件元数据中记录的数据集版本 (snapshot_store.dataset_version)，文件不存在或没有该字段时返回 None。"""
+    try:
+        metadata = pq.read_schema(get_columnar_path(task_name)).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    version = metadata.get(b"dataset_version")
+    return version.decode('utf-8') if version else None
+
+
+def write_columnar_dataset(ndjson_path, columns, task_name, version=None):
+    """
+    将 NDJSON 记录文件转换为紧凑的 Parquet 文件 (供 app.load_data 按列读取)。
+    只保留 columns 中的列 (至少有一个非空值的列)；DICTIONARY_COLUMNS 以字典编码存储。
+    version (对应 JSON 数据集的 dataset_version) 写入文件元数据，读取方据此判断 Parquet 是否与 JSON 一致。
+    先写临时文件再替换，避免读取到写了一半的文件。
+    """
+    columnar_path = get_columnar_path(task_name)
+    try:
+        table = pa_json.read_json(ndjson_path)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # 同一列出现无法统一的类型时跳过列式文件；删除旧的列式文件，app 回退到 JSON，而不是读取过时的数据
+        print(f"[-] 生成列式数据文件失败，跳过: {e}")
+        if os.path.exists(columnar_path):
+            os.remove(columnar_path)
+        return
+    table = table.select([column for column in columns if column in table.column_names])
+
+    for column in DICTIONARY_COLUMNS:
+        if column in table.column_names:
+            i = table.column_names.index(column)
+            table = table.set_column(i, column, pc.dictionary_encode(table.column(column)))
+    if version:
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, dataset_version=version))
+
+    tmp_path = columnar_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, columnar_path)
+    print(f"已写入列式数据文件: {columnar_path} ({table.num_columns} 列)")
+
+
+# --- PRE-AGGREGATED ROLLUPS ---
+
+def get_rollups_path(task_name):
+    return os.path.join(OUTPUT_DIR, f"{task_name}.rollups.json")
+
+
+class RollupAccumulator:
+    """
+    逐条累计 app.py 图表所需的统计：按日 / 周 / 月、按小时、按 小时×星期 的记录数
+    (仅统计 ROLLUP_CUTOFF_DATE 之后的记录)。app 直接用它绘图，无需加载原始记录；
+    周、月计数以周一和每月 1 日为键，供长时间范围的图表按点数预算降低粒度。
+    另外记录全部记录的单位计数和最早/最晚发布日期，供 app 的筛选控件使用。
+    """
+
+    def __init__(self):
+        self.cutoff = datetime.strptime(ROLLUP_CUTOFF_DATE, "%Y-%m-%d")
+        self.total = 0
+        self.filtered = 0
+        self.units = {}
+        self.first_day = None
+        self.last_day = None
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        self.hourly = [0] * 24
+        self.hour_weekday = [[0] * 7 for _ in range(24)]  # [小时][星期，周一为 0]
+
+    def add(self, item):
+        self.total += 1
+        unit = item.get('companyTypeName')
+        if unit:
+            self.units[unit] = self.units.get(unit, 0) + 1
+        try:
+            publish_dt = datetime.strptime(item.get('publishDate') or '', "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return
+        day = publish_dt.strftime("%Y-%m-%d")
+        self.first_day = min(self.first_day or day, day)
+        self.last_day = max(self.last_day or day, day)
+        if publish_dt < self.cutoff:
+            return
+        self.filtered += 1
+        self.daily[day] = self.daily.get(day, 0) + 1
+        week = (publish_dt - timedelta(days=publish_dt.weekday())).strftime("%Y-%m-%d")
+        self.weekly[week] = self.weekly.get(week, 0) + 1
+        month = publish_dt.strftime("%Y-%m-01")
+        self.monthly[month] = self.monthly.get(month, 0) + 1
+        self.hourly[publish_dt.hour] += 1
+        self.hour_weekday[publish_dt.hour][publish_dt.weekday()] += 1
+
+    def result(self):
+        return {
+            "cutoff": ROLLUP_CUTOFF_DATE,
+            "total": self.total,
+            "filtered": self.filtered,
+            "daily": dict(sorted(self.daily.items())),
+            "weekly": dict(sorted(self.weekly.items())),
+            "monthly": dict(sorted(self.monthly.items())),
+            "hourly": self.hourly,
+            "hour_weekday": self.hour_weekday,
+            "units": dict(sorted(self.units.items(), key=lambda entry: -entry[1])),
+            "first_day": self.first_day,
+            "last_day": self.last_day,
+        }
+
+
+def build_rollups(records):
+    accumulator = RollupAccumulator()
+    for item in records:
+        accumulator.add(item)
+    return accumulator.result()
+
+
+def write_rollups(rollups, task_name, version=None):
+    """写出预聚合统计，附带对应 JSON 数据集的 dataset_version，读取方据此判断统计是否与数据集一致。"""
+    write_json_atomic(get_rollups_path(task_name), dict(rollups, dataset_version=version))
+
+
+# --- STREAMING DATASET WRITER ---
+
+class DatasetWriter:
+    """
+    流式写出一个数据集的全部文件：记录逐条写入 JSON 数据集 (DATASET_STORAGE 为 delta 时与上一状态对比，
+    只写出增量文件；为 full 时写入格式与 json.dump(indent=4) 一致的临时文件) 和 NDJSON 临时文件，
+    同时累计预聚合统计、非空列和已知 id；commit() 时生成 Parquet 并原子替换正式文件。
+    内存占用与数据集大小无关 (已知 id 索引和本次增量除外)。delta 模式下记录须按 id 升序写入。
+    """
+
+    def __init__(self, task_name):
+        self.task_name = task_name
+        self.output_path = get_output_path(task_name)
+        self.ndjson_tmp_path = os.path.join(OUTPUT_DIR, f"{task_name}.export.ndjson.tmp")
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        if DATASET_STORAGE == "delta":
+            self._json_file = None
+            self.snapshot = SnapshotWriter(self.output_path, VOLATILE_FIELDS)
+        else:
+            self._json_file = open(self.output_path + ".tmp", 'w', encoding='utf-8')
+            self.snapshot = None
+        self._ndjson_file = open(self.ndjson_tmp_path, 'w', encoding='utf-8')
+        self.rollups = RollupAccumulator()
+        self.columns = []
+        self.known_ids = {}
+
+    def write(self, item):
+        if self.snapshot is not None:
+            # 快照按 id 对比，没有 id 的记录无法进入快照
+            if 'id' in item:
+                self.snapshot.write(item)
+        else:
+            prefix = "[\n" if self.rollups.total == 0 else ",\n"
+            self._json_file.write(prefix + textwrap.indent(json.dumps(item, indent=4, ensure_ascii=False), "    "))
+        self._ndjson_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.rollups.add(item)
+        for key, value in item.items():
+            if value is not None and key not in self.columns:
+                self.columns.append(key)
+        if 'id' in item:
+            self.known_ids[item['id']] = item.get('publishDate')
+
+    def commit(self):
+        self._ndjson_file.close()
+        unchanged = False
+        if self.snapshot is not None:
+            # 变化时间使用北京时间，与 metadata.json 的抓取时间及 api.py 的 since 一致
+            kind, changes = self.snapshot.commit(now=datetime.now(CST_TZ))
+            if kind == "base":
+                print(f"已将新数据写入本地文件: {self.output_path} (基础快照，{self.snapshot.count} 条记录)")
+            elif kind == "delta":
+                print(f"已将 {changes} 条变化写入增量文件 (基础快照: {self.output_path})")
+            else:
+                unchanged = True
+                print(f"数据集无变化，未改写 {self.output_path}")
+        else:
+            self._json_file.write("\n]" if self.rollups.total else "[]")
+            self._json_file.close()
+            os.replace(self.output_path + ".tmp", self.output_path)
+            # 从 delta 切换回 full 时删除残留的增量文件，否则读取时会重放到新的 JSON 数组上
+            remove_deltas(self.output_path, float('inf'))
+            print(f"已将新数据写入本地文件: {self.output_path}")
+        version = dataset_version(self.output_path)
+        # 数据集未变化且 Parquet 已是同一版本时不必重写
+        if self.rollups.total and not (unchanged and read_columnar_version(self.task_name) == version):
+            # 不含 VOLATILE_FIELDS (每次运行都不同)，数据不变时 Parquet 内容也不变
+            write_columnar_dataset(self.ndjson_tmp_path, [column for column in self.columns if column not in VOLATILE_FIELDS], self.task_name, version)
+        elif not self.rollups.total and os.path.exists(get_columnar_path(self.task_name)):
+            # 数据集为空时不生成列式文件，旧文件必须删除
+            os.remove(get_columnar_path(self.task_name))
+        write_rollups(self.rollups.result(), self.task_name, version)
+        os.remove(self.ndjson_tmp_path)
+        # 检索索引改由 app.py 加载数据时建立，删除旧版本写出的索引文件，不再随数据提交
+        legacy_index_path = os.path.join(OUTPUT_DIR, f"{self.task_name}.search.json")
+        if os.path.exists(legacy_index_path):
+            os.remove(legacy_index_path)
+
+    def abort(self):
+        if self.snapshot is not None:
+            self.snapshot.abort()
+        for f, path in ((self._json_file, self.output_path + ".tmp"), (self._ndjson_file, self.ndjson_tmp_path)):
+            if f is None:
+                continue
+            f.close()
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_dataset(records, task_name):
+    """流式写出数据集 (JSON / Parquet / 预聚合统计)，返回已知 id 索引 {id: publishDate}。列表按 id 排序后写入。"""
+    if isinstance(records, list):
+        records = sorted(records, key=lambda item: str(item.get('id', '')))
+    writer = DatasetWriter(task_name)
+    try:
+        for item in records:
+            writer.write(item)
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    return writer.known_ids
+
+
+# --- INCREMENTAL CRAWL (TASK_1 / TASK_2) ---
+
+def get_known_index_path(task_name):
+    return os.path.join(OUTPUT_DIR, f"{task_name}.index.json")
+
+
+def load_known_index(task_name):
+    """读取已知记录索引 {"high_water", "last_full_crawl", "ids": {id: publishDate}}，不存在或损坏时返回 None。"""
+    index_path = get_known_index_path(task_name)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index.get('ids'), dict):
+            return index
+    except Exception as e:
+        print(f"[-] 已知记录索引 {index_path} 读取失败，将执行全量抓取。错误: {e}")
+    return None
+
+
+def save_known_index(task_name, ids, last_full_crawl):
+    """ids: {id: publishDate}，由 write_dataset 在写出数据集时收集。"""
+    publish_dates = [date for date in ids.values() if date]
+    index = {
+        "high_water": max(publish_dates) if publish_dates else None,
+        "last_full_crawl": last_full_crawl,
+        "ids": ids,
+    }
+    write_json_atomic(get_known_index_path(task_name), index)
+
+
+def is_full_refresh_due(index):
+    last_full_crawl = index.get('last_full_crawl')
+    if not last_full_crawl:
+        return True
+    try:
+        last_full_dt = CST_TZ.localize(datetime.strptime(last_full_crawl, "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        return True
+    return (datetime.now(CST_TZ) - last_full_dt).total_seconds() >= FULL_REFRESH_HOURS * 3600
+
+
+def is_known_record(item, index):
+    """记录 id 已知且发布时间未超过索引中记录的值时视为已知 (重新发布的记录会被重新抓取)。"""
+    known_date = index['ids'].get(item.get('id'))
+    if known_date is None:
+        return False
+    publish_date = item.get('publishDate')
+    return not publish_date or publish_date <= known_date
+
+
+def scrape_incremental(payload_override, output_name, index, session=None, telemetry=None):
+    """
+    增量抓取：列表按发布时间倒序返回，逐页抓取直到某一整页全部为已知记录。
+    返回 (本次抓取到的记录, 是否成功)。
+    """
+    payload = build_payload(payload_override)
+    page_size = payload['size']
+
+    if session is None:
+        session = create_session(1)
+
+    print(f"[{output_name}] 开始增量抓取 (高水位: {index.get('high_water')}，已知 {len(index['ids'])} 条)...")
+
+    pages = {}
+    current_page = payload['current']
+    while True:
+        try:
+            print(f"[{output_name}] 正在抓取第 {current_page} 页...")
+            page_content = get_page_content(fetch_page(session, payload, current_page, telemetry=telemetry))
+        except requests.exceptions.RequestException as e:
+            print(f"[{output_name}] 请求第 {current_page} 页时发生错误: {e}")
+            return merge_pages(pages), False
+        except json.JSONDecodeError:
+            print(f"[{output_name}] 无法解析 JSON 响应。")
+            return merge_pages(pages), False
+
+        if not page_content:
+            break
+        pages[current_page] = page_content
+
+        new_count = sum(1 for item in page_content if not is_known_record(item, index))
+        print(f"[{output_name}] 第 {current_page} 页: {new_count}/{len(page_content)} 条为新记录。")
+        if new_count == 0 or len(page_content) < page_size:
+            break
+
+        current_page += 1
+
+    fetched = merge_pages(pages)
+    print(f"[{output_name}] 增量抓取完成，共请求 {len(pages)} 页。")
+    return fetched, True
+
+
+def merge_snapshot(fetched, old_data):
+    """将本次抓取到的记录合并进旧数据集：新抓取的记录在前并覆盖同 id 的旧记录。"""
+    fetched_ids = {item['id'] for item in fetched if 'id' in item}
+    return fetched + [item for item in old_data if item.get('id') not in fetched_ids]
+
+
+# --- CHANGE-DETECTION PROBE ---
+
+def get_probe_path(task_key):
+    # 与差异索引放在一起，例如 zgyd/task_3_probe.json
+    return os.path.join(OUTPUT_DIR, f"{task_key.lower()}_probe.json")
+
+
+def probe_fingerprint(payload_override, output_name, session, telemetry=None):
+    """
+    请求完整的首页 (与全量抓取的每页条数相同)，对总数和每条记录的 id 及 DIFF_FIELDS 字段计算指纹，
+    首页内任一记录的截止时间或标题变化都会触发全量抓取；TASK_3 通常只有一页，指纹即覆盖全部记录，
+    超过一页时首页之外的变化由 FULL_REFRESH_HOURS 的定期全量抓取发现。
+    探测失败或接口未返回总数时返回 None (此时无法判断删除，必须全量抓取)。
+    """
+    payload = build_payload(payload_override)
+    try:
+        response_json = fetch_page(session, payload, 1, retries=0, telemetry=telemetry)
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        print(f"[{output_name}] 变更探测失败，将执行全量抓取: {e}")
+        return None
+
+    total = get_total_count(response_json)
+    if total is None:
+        print(f"[{output_name}] 响应中没有总数字段，无法使用变更探测。")
+        return None
+
+    if total > payload['size']:
+        print(f"[{output_name}] 共 {total} 条记录，超过一页，探测指纹只覆盖首页 {payload['size']} 条。")
+    items = [[item.get(field) for field in ['id', *DIFF_FIELDS]] for item in get_page_content(response_json)]
+    digest_source = json.dumps({"total": total, "items": items}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(digest_source.encode('utf-8')).hexdigest()
+
+
+def load_probe_state(task_key):
+    """读取探测状态 {"fingerprint", "last_full_crawl"}，不存在或损坏时返回空字典。"""
+    probe_path = get_probe_path(task_key)
+    if not os.path.exists(probe_path):
+        return {}
+    try:
+        with open(probe_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_probe_state(task_key, fingerprint, last_full_crawl):
+    write_json_atomic(get_probe_path(task_key), {"fingerprint": fingerprint, "last_full_crawl": last_full_crawl}, indent=4)
+
+
+# --- NOTICE DETAIL ENRICHMENT ---
+
+def get_detail_path(uuid, miss=False):
+    """
+    详情缓存路径：以 uuid 的 SHA-1 为文件名，按前两位分目录 (与 dataset_cache.get_detail_path 一致)；
+    miss 为 True 时为抓取失败记录 (<哈希>.miss.json) 的路径。
+    """
+    digest = hashlib.sha1(str(uuid).encode('utf-8')).hexdigest()
+    return os.path.join(DETAIL_CACHE_DIR, digest[:2], f"{digest}.miss.json" if miss else f"{digest}.json")
+
+
+def is_detail_miss_fresh(uuid, now_str):
+    """uuid 最近 DETAIL_MISS_RETRY_HOURS 内抓取失败过 (未到重试时间)。"""
+    try:
+        with open(get_detail_path(uuid, miss=True), 'r', encoding='utf-8') as f:
+            return json.load(f).get("retry_after", "") > now_str
+    except (OSError, ValueError):
+        return False
+
+
+def save_detail_miss(item, reason):
+    now = datetime.now(CST_TZ)
+    path = get_detail_path(item['uuid'], miss=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json_atomic(path, {
+        "uuid": item['uuid'], "id": item.get('id'), "reason": reason,
+        "failed_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "retry_after": (now + timedelta(hours=DETAIL_MISS_RETRY_HOURS)).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def load_detail_summary(uuid):
+    """读取缓存中的详情摘要 {显示名称: 值}；未缓存或文件损坏时返回空字典。"""
+    if not uuid:
+        return {}
+    try:
+        with open(get_detail_path(uuid), 'r', encoding='utf-8') as f:
+            return json.load(f).get("summary") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def extract_detail_summary(detail):
+    """按 DETAIL_SUMMARY_FIELDS 从详情 JSON (含一层嵌套对象) 中提取摘要字段，缺失的字段不出现在结果中。"""
+    layers = [detail] + [value for value in detail.values() if isinstance(value, dict)]
+    summary = {}
+    for label, keys in DETAIL_SUMMARY_FIELDS.items():
+        for layer in layers:
+            value = next((layer[key] for key in keys if layer.get(key) not in (None, "")), None)
+            if value is not None:
+                summary[label] = str(value)
+                break
+    return summary
+
+
+def fetch_detail(session, item, telemetry=None, sequence=None):
+    """抓取一条公告的详情并写入缓存，返回摘要；接口未返回详情对象时返回 None。请求失败时抛出。"""
+    body = {"publishId": item.get('id'), "publishUuid": item.get('uuid'), "publishType": item.get('publishType'), "publishOneType": item.get('publishOneType')}
+    response_json = post_json(session, DETAIL_URL, body, f"详情 {item.get('id')} ", sequence, retries=DETAIL_MAX_RETRIES, telemetry=telemetry)
+    detail = response_json.get('data') if isinstance(response_json, dict) else None
+    if not isinstance(detail, dict) or not detail:
+        return None
+    summary = extract_detail_summary(detail)
+    path = get_detail_path(item['uuid'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json_atomic(path, {
+        "uuid": item['uuid'], "id": item.get('id'),
+        "fetched_at": datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S"),
+        "summary": summary, "detail": detail,
+    })
+    miss_path = get_detail_path(item['uuid'], miss=True)
+    if os.path.exists(miss_path):
+        os.remove(miss_path)
+    return summary
+
+
+def enrich_details(task_key, records, session):
+    """
+    为缓存中还没有详情的记录 (按 uuid 去重，每次最多 DETAIL_MAX_PER_RUN 条) 并发抓取详情，
+    线程池大小为 DETAIL_MAX_WORKERS，共用 session 的连接池和全局速率预算。
+    失败的 uuid 写入失败记录，DETAIL_MISS_RETRY_HOURS 后再重试；连续 DETAIL_MAX_CONSECUTIVE_FAILURES 条失败时
+    放弃本次运行剩余的条目。未设置 CRAWLER_DETAIL_URL 时不补全。
+    """
+    if not DETAIL_URL or DETAIL_MAX_WORKERS <= 0:
+        return
+    now_str = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    pending = {}
+    for item in records:
+        uuid = item.get('uuid')
+        if uuid and uuid not in pending and not os.path.exists(get_detail_path(uuid)) and not is_detail_miss_fresh(uuid, now_str):
+            pending[uuid] = item
+    if not pending:
+        return
+    items = list(pending.values())[:DETAIL_MAX_PER_RUN]
+    print(f"[{task_key}] 补全 {len(items)} 条新公告的详情 (未缓存 {len(pending)} 条)...")
+
+    telemetry = CrawlTelemetry(task_key, "detail")
+    lock = threading.Lock()
+    stopped = threading.Event()
+    failures = [0]  # 连续失败次数
+
+    def fetch(item, sequence):
+        if stopped.is_set():
+            return None, "skipped"
+        try:
+            summary, reason = fetch_detail(session, item, telemetry, sequence), "接口未返回详情"
+        except Exception as e:
+            summary, reason = None, f"{type(e).__name__}: {e}"
+        with lock:
+            failures[0] = 0 if summary is not None else failures[0] + 1
+            if failures[0] >= DETAIL_MAX_CONSECUTIVE_FAILURES and not stopped.is_set():
+                stopped.set()
+                print(f"[-] 详情连续 {failures[0]} 条抓取失败，停止本次补全 (接口: {DETAIL_URL})。")
+        if summary is None:
+            save_detail_miss(item, reason)
+        return summary, reason
+
+    fetched = skipped = 0
+    with ThreadPoolExecutor(max_workers=min(DETAIL_MAX_WORKERS, len(items))) as executor:
+        futures = {executor.submit(fetch, item, sequence): item for sequence, item in enumerate(items, 1)}
+        for future in as_completed(futures):
+            summary, reason = future.result()
+            if summary is not None:
+                fetched += 1
+            elif reason == "skipped":
+                skipped += 1
+            else:
+                print(f"[-] 公告 {futures[future].get('id')} 详情抓取失败: {reason}")
+    telemetry.finish(fetched == len(items), fetched)
+    print(f"[{task_key}] 详情补全完成：成功 {fetched}/{len(items)} 条" + (f"，跳过 {skipped} 条。" if skipped else "。"))
+
+
+# --- DEADLINE INDEX ---
+
+def get_deadline_index_path(task_key):
+    # 例如 zgyd/task_3_deadlines.json (dataset_cache.get_deadline_index_path 与此一致)
+    return os.path.join(OUTPUT_DIR, f"{task_key.lower()}_deadlines.json")
+
+
+def load_deadline_index(task_key):
+    """
+    读取截止时间索引：{"pending": [[截止时间, 字段, id], ...] (最小堆), "alerted": [...] (已提醒、尚未截止，按时间升序)}。
+    文件不存在或损坏时返回 None。
+    """
+    try:
+        with open(get_deadline_index_path(task_key), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or "pending" not in index:
+        return None
+    index.setdefault("alerted", [])
+    return index
+
+
+def save_deadline_index(task_key, index):
+    write_json_atomic(get_deadline_index_path(task_key), index, separators=(',', ':'))
+
+
+def deadline_entries(record_id, fields, now_str):
+    """记录中尚未到期的截止时间条目 (哨兵值 1900-01-01 等过去的时间自然被排除)。"""
+    return [[fields[field], field, record_id] for field in DEADLINE_FIELDS if fields.get(field) and fields[field] > now_str]
+
+
+def update_deadline_index(task_key, diff_index, added_items, modified_items):
+    """
+    按本次差异结果增量更新截止时间索引：新增记录和截止时间变更的记录压入新条目。
+    下线记录和被修改前的旧截止时间不立即删除，弹出时与差异索引核对后丢弃 (惰性删除)。
+    索引不存在时由差异索引全量建立。
+    """
+    now_str = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    index = load_deadline_index(task_key)
+    if index is None:
+        pending = [entry for record_id, item in diff_index.items() for entry in deadline_entries(record_id, item["fields"], now_str)]
+        heapq.heapify(pending)
+        index = {"pending": pending, "alerted": []}
+        print(f"[*] 截止时间索引已建立：{len(pending)} 个未到期的截止时间。")
+    else:
+        for item in added_items:
+            for entry in deadline_entries(item['id'], item, now_str):
+                heapq.heappush(index["pending"], entry)
+        for modified in modified_items:
+            changed = {field: after for field, _, after in modified["changes"] if field in DEADLINE_FIELDS}
+            for entry in deadline_entries(modified["item"]['id'], changed, now_str):
+                heapq.heappush(index["pending"], entry)
+    save_deadline_index(task_key, index)
+
+
+def is_current_deadline(entry, diff_index):
+    """条目是否仍与差异索引中的记录一致 (记录未下线、截止时间未变更)。"""
+    deadline, field, record_id = entry
+    item = diff_index.get(record_id)
+    return item is not None and item["fields"].get(field) == deadline
+
+
+def pop_closing_soon(task_key, diff_index, hours=None):
+    """
+    弹出截止时间落在 (现在, 现在 + hours] 内的条目，返回 (更新后的索引, [(截止时间, 字段, 记录字段), ...])。
+    只访问堆顶进入窗口的条目，不扫描全部记录；弹出的有效条目移入 alerted，保证每个截止时间只提醒一次。
+    不写回文件：调用方在提醒推送发出后再 save_deadline_index，推送前出错时条目仍留在堆中。
+    """
+    index = load_deadline_index(task_key)
+    if index is None:
+        return None, []
+    hours = CLOSING_SOON_HOURS if hours is None else hours
+    now = datetime.now(CST_TZ)
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    horizon_str = (now + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+    pending, due = index["pending"], []
+    while pending and pending[0][0] <= horizon_str:
+        entry = heapq.heappop(pending)
+        # 已截止 (错过提醒窗口) 或已失效的条目直接丢弃
+        if entry[0] <= now_str or not is_current_deadline(entry, diff_index):
+            continue
+        due.append((entry[0], entry[1], diff_index[entry[2]]["fields"]))
+        index["alerted"].append(entry)
+    index["alerted"] = sorted(entry for entry in index["alerted"] if entry[0] > now_str)
+    return index, due
+
+
+def build_closing_soon_sections(task_key, due, hours):
+    """生成截止提醒报告的各个组成部分 (结构同 build_report_sections)，按截止类型分组、截止时间升序。"""
+    now = datetime.now(CST_TZ)
+    header = "".join([
+        f"## {get_notify_label(task_key)}即将截止 ({hours:g} 小时内)\n",
+        f"**时间：** {now.strftime('%Y-%m-%d %H:%M:%S')}\n",
+        f"**总计：** {len(due)} 个截止时间\n\n",
+    ])
+    sections = []
+    for field in DEADLINE_FIELDS:
+        entries = sorted((entry for entry in due if entry[1] == field), key=lambda entry: entry[0])
+        if not entries:
+            continue
+        blocks = []
+        for deadline, _, fields in entries:
+            remaining = CST_TZ.localize(datetime.strptime(deadline, "%Y-%m-%d %H:%M:%S")) - now
+            blocks.append(f"> - **{DIFF_FIELDS[field]}:** {deadline} (剩余 {remaining.total_seconds() / 3600:.1f} 小时)\n" + format_item_details(fields))
+        sections.append((f"### [!] {DIFF_FIELDS[field]} ({len(entries)}): \n", blocks))
+    return header, sections, build_report_footer()
+
+
+def notify_closing_soon(task_key, hours=None):
+    """
+    开启 deadlines 的任务每次运行 (包括探测未变化时) 检查进入提醒窗口的截止时间，合并为一份摘要推送。
+    没有配置推送地址时不修改索引；推送发出后才把条目标记为已提醒，投递失败的消息由投递日志在下次运行时补发。
+    """
+    hours = CLOSING_SOON_HOURS if hours is None else hours
+    server_chan_url_list = parse_server_chan_urls(os.environ.get("WECHAT_WEBHOOK_URL"))
+    if not server_chan_url_list:
+        print("[-] 环境变量 WECHAT_WEBHOOK_URL 为空，跳过截止提醒检查。")
+        return
+    index, due = pop_closing_soon(task_key, load_diff_index(task_key), hours)
+    if due:
+        print(f"[!] {len(due)} 个截止时间将在 {hours:g} 小时内到期，推送截止提醒。")
+        messages = split_report_sections(*build_closing_soon_sections(task_key, due, hours))
+        send_server_chan_notification(server_chan_url_list, messages, title=f"{get_notify_label(task_key)}截止提醒")
+    else:
+        print(f"[*] {hours:g} 小时内没有新的截止提醒。")
+    if index is not None:
+        # 无新提醒时也写回：已过期的条目从堆中弹出、从 alerted 中清理
+        save_deadline_index(task_key, index)
+
+
+# 定义时区常量
+CST_TZ = pytz.timezone('Asia/Shanghai')
+
+
+def get_output_path(task_name):
+    return os.path.join(OUTPUT_DIR, f"{task_name}.json")
+
+
+def print_task_header(task_key):
+    print(f"==================================================")
+    print(f"任务键: {task_key}，目标数据集: {TASK_CONFIG[task_key]['name']}")
+    print(f"==================================================")
+
+
+def create_records_sink(output_name):
+    return NdjsonSink(os.path.join(OUTPUT_DIR, f"{output_name}.records.ndjson.tmp"))
+
+
+def discard_records(records):
+    """删除流式抓取产生的临时记录文件 (内存中的列表无需处理)。"""
+    if isinstance(records, NdjsonSink):
+        records.discard()
+
+
+def fetch_task_data(task_key, session):
+    """
+    按任务配置抓取数据 (含变更探测和增量模式)。
+    返回 (数据, 是否成功, 上下文)，上下文中的 unchanged 表示探测到数据未变化、无需写入。
+    """
+    config = TASK_CONFIG[task_key]
+    task_name = config["name"]
+    output_path = get_output_path(task_name)
+    context = {"fingerprint": None, "unchanged": False}
+    telemetry = CrawlTelemetry(task_key, "full")
+
+    # --- 变更探测：首页指纹与上次全量抓取时一致，说明数据未变化，跳过全量抓取和文件重写 ---
+    #     距上次全量抓取超过 FULL_REFRESH_HOURS 时仍全量抓取，发现首页之外记录的字段变化
+    if config.get("probe"):
+        context["fingerprint"] = probe_fingerprint(config["payload"], task_name, session, telemetry)
+        probe_state = load_probe_state(task_key)
+        if context["fingerprint"] and context["fingerprint"] == probe_state.get('fingerprint') and os.path.exists(output_path):
+            if is_full_refresh_due(probe_state):
+                print(f"[{task_name}] 探测指纹未变化，但距上次全量抓取已超过 {FULL_REFRESH_HOURS:g} 小时，执行全量抓取。")
+            else:
+                print(f"[{task_name}] 探测指纹未变化，跳过全量抓取、推送和文件写入。")
+                context["unchanged"] = True
+                telemetry.mode = "probe"
+                telemetry.finish(True, 0)
+                return [], True, context
+
+    # --- 增量模式：索引有效且未到全量刷新时间时，只抓取新记录并合并进已有数据集 ---
+    index = load_known_index(task_name) if config.get("incremental") else None
+    old_snapshot = read_snapshot(output_path) if index and not is_full_refresh_due(index) else []
+
+    if old_snapshot:
+        telemetry.mode = "incremental"
+        fetched, success = scrape_incremental(config["payload"], task_name, index, session=session, telemetry=telemetry)
+        telemetry.finish(success, len(fetched))
+        context["last_full_crawl"] = index.get('last_full_crawl')
+        return merge_snapshot(fetched, old_snapshot), success, context
+
+    # 全量抓取的记录流式写入临时 NDJSON 文件，不在内存中累积
+    new_data, success = scrape_content(config["payload"], task_name, session=session, sink=create_records_sink(task_name), telemetry=telemetry)
+    telemetry.finish(success, len(new_data))
+    context["last_full_crawl"] = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    return new_data, success, context
+
+
+def save_task_results(task_key, new_data, context, session=None):
+    """处理抓取结果：补全新公告详情、差异推送和截止时间索引 (notify/deadlines)、写入数据集文件、更新增量索引和探测指纹。"""
+    config = TASK_CONFIG[task_key]
+    task_name = config["name"]
+
+    # 详情在推送前补全，报告中即可带上预算、采购方式和联系人
+    if config.get("enrich"):
+        try:
+            enrich_details(task_key, new_data, session or create_session(DETAIL_MAX_WORKERS))
+        except Exception as e:
+            print(f"[-] 详情补全失败: {e}")
+
+    # --- 核心逻辑分支：差异化推送与状态管理 (tasks.json 中开启 notify 或 deadlines 的任务) ---
+    # 截止时间索引弹出条目时要与差异索引核对，只开启 deadlines 时也需维护差异索引
+    if config.get("notify") or config.get("deadlines"):
+        diff_index_path = get_diff_index_path(task_key)
+
+        # 1. 获取差异索引 (从本地文件)
+        #    (该文件由上一次 Action 运行时的 git-auto-commit 提交)
+        old_index = load_diff_index(task_key)
+        
+        # 2. 对比数据 (单次遍历，检测新增、删除和关键字段修改)
+        added_items, removed_items, modified_items, new_index = compare_data_and_generate_report(new_data, old_index)
+        
+        # 3. 报告并推送 (仅在有变动时)
+        if added_items or removed_items or modified_items:
+            print(f"发现变动：新增 {len(added_items)} 条, 删除 {len(removed_items)} 条, 修改 {len(modified_items)} 条。")
+
+            # 检查 Server Chan URL 是否存在 (只开启 deadlines 的任务不推送变动报告)
+            server_chan_urls_str = os.environ.get("WECHAT_WEBHOOK_URL")
+            server_chan_url_list = parse_server_chan_urls(server_chan_urls_str)
+
+            if not config.get("notify"):
+                print("[*] 任务未开启 notify，跳过变动推送。")
+            elif not server_chan_url_list:
+                print("[-] 环境变量 WECHAT_WEBHOOK_URL 为空，跳过 Server Chan 推送。")
+            else:
+                # 生成 Markdown 报告 (超长时按条目拆分为多条消息)
+                report_messages = split_markdown_report(task_key, added_items, removed_items, modified_items)
+                # 调用推送函数
+                send_server_chan_notification(server_chan_url_list, report_messages, title=f"{get_notify_label(task_key)}数据更新")
+
+        else:
+            print("数据无变化，跳过推送和状态更新。")
+
+        # 4. 提交新的差异索引 (写入本地文件，由 git-auto-commit-action 提交)
+        #    无变动时仅在索引尚不存在 (由旧版状态文件迁移) 时写入
+        if added_items or removed_items or modified_items or not os.path.exists(diff_index_path):
+            commit_new_state(new_index, diff_index_path)
+
+        # 5. 更新截止时间索引 (只处理新增和截止时间变更的记录)
+        if config.get("deadlines") and (added_items or modified_items or not os.path.exists(get_deadline_index_path(task_key))):
+            update_deadline_index(task_key, new_index, added_items, modified_items)
+
+    # --- 通用逻辑：写入本地 JSON 文件 (供 Streamlit 读取) ---
+    # 所有任务的数据都写入本地文件，由 git-auto-commit-action 统一提交
+    try:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        # 先写入历史库，JSON 数据集由历史库逐条导出并流式写出 (TASK_3 写入 zgyd/所有招采_正在招标_北京.json)
+        with closing(open_history_store()) as conn:
+            seen_at = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+            added, changed, removed = record_history(conn, task_key, new_data, seen_at)
+            print(f"[{task_name}] 历史库已更新：新增 {added}，修改 {changed}，下线 {removed}。")
+            known_ids = write_dataset(export_snapshot(conn, task_key), task_name)
+        # 索引必须在数据集写入成功后再更新，否则下次增量抓取会漏掉记录
+        if config.get("incremental"):
+            save_known_index(task_name, known_ids, context.get("last_full_crawl"))
+        if context.get("fingerprint"):
+            save_probe_state(task_key, context["fingerprint"], context.get("last_full_crawl"))
+    except Exception as e:
+        print(f"写入本地 JSON 文件失败: {e}")
+
+
+def uses_notifications(task_keys):
+    """任务中是否有开启推送 (notify 或 deadlines) 的任务，有则在抓取前补发上次未送达的消息。"""
+    return any(TASK_CONFIG[task_key].get("notify") or TASK_CONFIG[task_key].get("deadlines") for task_key in task_keys)
+
+
+def run_crawler_job(task_key, session=None):
+    if task_key not in TASK_CONFIG:
+        print(f"错误：无效的任务键 '{task_key}'。")
+        return
+
+    task_name = TASK_CONFIG[task_key]["name"]
+    print_task_header(task_key)
+
+    if uses_notifications([task_key]):
+        retry_pending_notifications(parse_server_chan_urls(os.environ.get("WECHAT_WEBHOOK_URL")))
+
+    if session is None:
+        session = create_session()
+
+    new_data, success, context = fetch_task_data(task_key, session)
+
+    try:
+        if context["unchanged"]:
+            update_task_metadata(task_name)
+            return
+        if not success:
+            print("抓取失败，跳过文件保存和元数据更新。")
+            return
+        save_task_results(task_key, new_data, context, session)
+    finally:
+        discard_records(new_data)
+        # 截止提醒与数据是否变化无关 (时间推移即可触发)，抓取失败时按上次的索引检查
+        if TASK_CONFIG[task_key].get("deadlines"):
+            notify_closing_soon(task_key)
+
+    # --- 通用逻辑：更新元数据 (用于 Streamlit 显示更新时间) ---
+    update_task_metadata(task_name)
+
+
+def filter_records(records, local_filter):
+    """按字段值在本地过滤记录，例如 {"companyTypeName": "北京"}。"""
+    return [item for item in records if all(item.get(field) == value for field, value in local_filter.items())]
+
+
+def group_tasks_by_query(task_keys):
+    """
+    将只在 companyType 上不同、且配置了 local_filter 的任务归为一组，组内只需抓取一次最宽的查询。
+    返回 [(基础查询参数, [任务键, ...]), ...]，保持任务的原始顺序。
+    """
+    groups = {}
+    for task_key in task_keys:
+        config = TASK_CONFIG[task_key]
+        payload = config["payload"]
+        if config.get("local_filter") and "companyType" in payload:
+            payload = {key: value for key, value in payload.items() if key != "companyType"}
+        groups.setdefault(json.dumps(payload, sort_keys=True), []).append(task_key)
+    return [(json.loads(group_key), keys) for group_key, keys in groups.items()]
+
+
+def run_task_group(base_payload, group_keys, session=None):
+    """
+    运行 group_tasks_by_query 返回的一个任务组，返回成功完成的数据集名称列表 (metadata.json 由调用方统一更新)。
+    组内只有一个任务时按单任务流程处理 (保留变更探测和增量模式)；
+    多个任务共享同一查询时只抓取一次，较窄的数据集按 local_filter 在本地派生。
+    """
+    if session is None:
+        session = create_session()
+    finished_names = []
+
+    if len(group_keys) == 1:
+        task_key = group_keys[0]
+        print_task_header(task_key)
+        new_data, success, context = fetch_task_data(task_key, session)
+        if context["unchanged"]:
+            finished_names.append(TASK_CONFIG[task_key]["name"])
+        elif success:
+            save_task_results(task_key, new_data, context, session)
+            finished_names.append(TASK_CONFIG[task_key]["name"])
+        else:
+            print("抓取失败，跳过文件保存和元数据更新。")
+        discard_records(new_data)
+        return finished_names
+
+    # 多个任务共享同一查询：抓取一次全量数据 (本地派生需要完整数据，不使用增量模式)
+    group_label = "+".join(TASK_CONFIG[task_key]["name"] for task_key in group_keys)
+    print(f"==================================================")
+    print(f"合并抓取: {', '.join(group_keys)}")
+    print(f"==================================================")
+    telemetry = CrawlTelemetry("+".join(group_keys), "combined")
+    base_data, success = scrape_content(base_payload, group_label, session=session, sink=create_records_sink(group_label), telemetry=telemetry)
+    telemetry.finish(success, len(base_data))
+    if not success:
+        print("抓取失败，跳过文件保存和元数据更新。")
+        discard_records(base_data)
+        return finished_names
+
+    context = {"last_full_crawl": datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")}
+    for task_key in group_keys:
+        config = TASK_CONFIG[task_key]
+        print_task_header(task_key)
+        if config["payload"] == base_payload:
+            task_data = base_data
+        else:
+            task_data = filter_records(base_data, config["local_filter"])
+            print(f"[{config['name']}] 本地派生 {len(task_data)} 条记录。")
+        save_task_results(task_key, task_data, context, session)
+        finished_names.append(config["name"])
+    discard_records(base_data)
+    return finished_names
+
+
+def init_worker_process(rate_state):
+    """进程池子进程初始化：接入父进程的共享速率状态，所有进程共用一个全局速率预算。"""
+    rate_controller.attach(rate_state)
+
+
+def run_task_group_in_process(base_payload, group_keys):
+    """进程池中的任务组入口：每个进程使用自己的连接池会话。"""
+    with closing(create_session()) as session:
+        return run_task_group(base_payload, group_keys, session)
+
+
+def run_crawler_jobs(task_keys, session=None):
+    """
+    多任务单次运行 (例如 TASK_2,TASK_3 或 ALL)：只在 companyType 上不同的任务只抓取一次最宽的查询，
+    较窄的数据集按 local_filter 在本地派生；不同查询的任务组分配到进程池 (最多 MAX_PROCESSES 个进程) 并行执行，
+    所有进程共享同一个自适应速率预算；所有输出写完后统一更新一次 metadata.json。
+    只有一个任务组或 MAX_PROCESSES <= 1 时在当前进程中依次执行，所有任务共用 session。
+    """
+    invalid_keys = [task_key for task_key in task_keys if task_key not in TASK_CONFIG]
+    if invalid_keys:
+        print(f"错误：无效的任务键 {invalid_keys}。")
+        return
+
+    if uses_notifications(task_keys):
+        retry_pending_notifications(parse_server_chan_urls(os.environ.get("WECHAT_WEBHOOK_URL")))
+
+    groups = group_tasks_by_query(task_keys)
+    processes = min(MAX_PROCESSES, len(groups))
+    finished_names = []
+
+    if processes > 1:
+        print(f"[*] {len(groups)} 个任务组分配到 {processes} 个进程并行执行，共享速率预算 ({rate_controller.report()})。")
+        rate_state = rate_controller.share()
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker_process, initargs=(rate_state,)) as executor:
+            futures = {executor.submit(run_task_group_in_process, base_payload, group_keys): group_keys for base_payload, group_keys in groups}
+            for future in as_completed(futures):
+                try:
+                    finished_names.extend(future.result())
+                except Exception as e:
+                    # 单个任务组失败不影响其他任务组的结果写入元数据
+                    print(f"[-] 任务组 {', '.join(futures[future])} 运行异常: {e}")
+    else:
+        if session is None:
+            session = create_session()
+        for base_payload, group_keys in groups:
+            finished_names.extend(run_task_group(base_payload, group_keys, session))
+
+    for task_key in task_keys:
+        if TASK_CONFIG[task_key].get("deadlines"):
+            notify_closing_soon(task_key)
+
+    if finished_names:
+        update_task_metadata(*finished_names)
+
+
+# --- DAEMON MODE ---
+
+def load_schedules():
+    """从任务注册表读取 [(Cron 表达式, [任务键, ...]), ...] (与 Cloudflare Worker 使用同一份 Cron 表，UTC)。"""
+    return get_schedules(TASK_CONFIG)
+
+
+def parse_cron_field(field, low, high):
+    """解析单个 Cron 字段 (支持 *、a-b、a,b、*/n 和 a-b/n)，返回取值集合。"""
+    values = set()
+    for part in field.split(','):
+        value_range, _, step = part.partition('/')
+        if value_range == '*':
+            start, end = low, high
+        elif '-' in value_range:
+            start, end = (int(value) for value in value_range.split('-'))
+        else:
+            start = end = int(value_range)
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+def cron_matches(expression, moment):
+    """判断 UTC 时间 moment (精确到分钟) 是否匹配 5 段 Cron 表达式。"""
+    minute, hour, day, month, weekday = expression.split()
+    weekdays = {value % 7 for value in parse_cron_field(weekday, 0, 7)}  # 0 和 7 都表示周日
+    day_match = moment.day in parse_cron_field(day, 1, 31)
+    weekday_match = (moment.weekday() + 1) % 7 in weekdays
+    # 标准 Cron 语义：日期和星期都有限制时满足其一即可
+    if day != '*' and weekday != '*':
+        date_match = day_match or weekday_match
+    else:
+        date_match = day_match and weekday_match
+    return (
+        moment.minute in parse_cron_field(minute, 0, 59)
+        and moment.hour in parse_cron_field(hour, 0, 23)
+        and moment.month in parse_cron_field(month, 1, 12)
+        and date_match
+    )
+
+
+def run_daemon():
+    """
+    常驻调度：每分钟检查一次任务注册表中的 Cron 表，在进程内运行到期的任务。
+    所有任务共用同一个长连接会话 (免去每次运行的冷启动和 TLS 握手) 和全局速率控制器
+    (同时到期的多个查询组由 run_crawler_jobs 分配到进程池，各进程使用自己的会话)；
+    任务在单个工作线程中依次执行，已在运行或排队中的任务再次到期时跳过本次触发。
+    """
+    schedules = load_schedules()
+    for cron, task_keys in schedules:
+        print(f"[*] 调度: {cron} (UTC) -> {', '.join(task_keys)}")
+
+    session = create_session()
+    executor = ThreadPoolExecutor(max_workers=1)
+    active_keys = set()
+    active_lock = threading.Lock()
+
+    def run_due_tasks(task_keys):
+        try:
+            if len(task_keys) == 1:
+                run_crawler_job(task_keys[0], session)
+            else:
+                run_crawler_jobs(task_keys, session)
+        except Exception as e:
+            # 单次运行失败不影响调度器，下一个周期继续执行
+            print(f"[-] 任务 {', '.join(task_keys)} 运行异常: {e}")
+        finally:
+            with active_lock:
+                active_keys.difference_update(task_keys)
+
+    print(f"[*] 常驻调度已启动，按 Ctrl+C 退出。")
+    last_minute = None
+    try:
+        while True:
+            # 等待到下一个整分钟 (稍微越过边界，避免提前醒来时重复检查上一分钟)
+            time.sleep(60 - time.time() % 60 + 0.1)
+            now = datetime.now(pytz.utc).replace(second=0, microsecond=0)
+            if now == last_minute:
+                continue
+            last_minute = now
+            due_keys = []
+            for cron, task_keys in schedules:
+                if cron_matches(cron, now):
+                    due_keys.extend(task_key for task_key in task_keys if task_key not in due_keys)
+            if not due_keys:
+                continue
+
+            with active_lock:
+                skipped = [task_key for task_key in due_keys if task_key in active_keys]
+                due_keys = [task_key for task_key in due_keys if task_key not in active_keys]
+                active_keys.update(due_keys)
+            if skipped:
+                print(f"[*] {now:%H:%M} UTC: {', '.join(skipped)} 上一次运行尚未结束，跳过本次触发。")
+            if due_keys:
+                print(f"[*] {now:%H:%M} UTC: 触发 {', '.join(due_keys)}。")
+                executor.submit(run_due_tasks, due_keys)
+    except KeyboardInterrupt:
+        print("[*] 正在退出，等待当前任务结束...")
+    finally:
+        executor.shutdown(wait=True)
+        session.close()
+
+
+def compact_datasets():
+    """把所有任务数据集的增量文件并入基础快照 (仅 delta 存储方式，否则会把 JSON 数组转换为快照格式)。"""
+    if DATASET_STORAGE != "delta":
+        print("[-] 数据集存储方式不是 delta (CRAWLER_DATASET_STORAGE)，无需压缩。")
+        return
+    for config in TASK_CONFIG.values():
+        output_path = get_output_path(config["name"])
+        if os.path.exists(output_path) and compact_snapshot(output_path, VOLATILE_FIELDS):
+            print(f"[+] 已压缩 {output_path}。")
+
+
+def update_task_metadata(*task_names):
+    metadata = load_metadata()
+    now_str = datetime.now(CST_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    for task_name in task_names:
+        metadata[task_name] = now_str
+    save_metadata(metadata)
+    print(f"元数据已更新。")
+
+
+def parse_task_keys(arg):
+    """解析命令行任务参数：单个任务键、逗号分隔的多个任务键，或 ALL。"""
+    if arg.strip().upper() == "ALL":
+        return list(TASK_CONFIG.keys())
+    return [task_key.strip() for task_key in arg.split(',') if task_key.strip()]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        # 常驻调度模式：按任务注册表的 Cron 表在进程内运行任务
+        run_daemon()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--compact":
+        # 把各数据集的增量文件并入基础快照 (正常运行时按 COMPACT_MAX_DELTAS 等阈值自动压缩)
+        compact_datasets()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--retry-notifications":
+        # 只补发上次未送达的通知，不抓取
+        retry_pending_notifications(parse_server_chan_urls(os.environ.get("WECHAT_WEBHOOK_URL")))
+    elif len(sys.argv) > 1:
+        task_keys_to_run = parse_task_keys(sys.argv[1])
+        if len(task_keys_to_run) == 1:
+            run_crawler_job(task_keys_to_run[0])
+        else:
+            run_crawler_jobs(task_keys_to_run)
     else:
-        print("错误：请提供任务键作为命令行参数 (例如: python crawler.py TASK_1)")
\ No newline at end of file
+        print("错误：请提供任务键作为命令行参数 (例如: python crawler.py TASK_1，python crawler.py TASK_2,TASK_3 或 python crawler.py ALL)")
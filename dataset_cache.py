@@ -0,0 +1,515 @@
+# dataset_cache.py
+
+"""
+进程级共享数据集缓存。
+
+Streamlit 每次交互都会重新执行 app.py，但被导入的模块只加载一次，
+因此缓存放在独立模块中，可被所有浏览器会话共享。
+每个文件版本 (路径 + mtime + 大小) 只解析和类型转换一次，文件被爬虫更新后自动失效。
+返回的 DataFrame 为所有会话共享的只读对象，调用方不得原地修改。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from search_index import SearchIndex
+from snapshot_store import get_delta_paths, read_snapshot, read_change_log, dataset_version
+
+OUTPUT_DIR = "./zgyd"
+METADATA_PATH = os.path.join(OUTPUT_DIR, "metadata.json")
+# 爬虫写入的运行指标 (当前文件 + 轮转后的旧文件，与 crawler.CRAWL_METRICS_PATH 一致)
+CRAWL_METRICS_PATHS = [os.path.join(OUTPUT_DIR, "crawl_metrics.1.ndjson"), os.path.join(OUTPUT_DIR, "crawl_metrics.ndjson")]
+
+# 爬虫写入的历史库 (与 crawler.HISTORY_DB_PATH 一致)；数据集不是快照格式时，api.py 用它查询某个时间点之后变化的记录
+HISTORY_DB_PATH = os.path.join(OUTPUT_DIR, "history.db")
+
+
+# 爬虫按 uuid 缓存的公告详情 (与 crawler.DETAIL_CACHE_DIR 一致)，看板按 DETAIL_SUMMARY_LABELS 的顺序显示摘要字段
+DETAIL_CACHE_DIR = os.path.join(OUTPUT_DIR, "details")
+DETAIL_SUMMARY_LABELS = ["预算", "采购方式", "联系人", "联系电话"]
+
+# show_statistics 实际用到的列 (图表 + 北京原始数据表)，加载数据时只读取这些列
+STATISTICS_COLUMNS = [
+    'id', 'uuid', 'publishType', 'publishOneType', 'companyTypeName', 'name',
+    'publishDate', 'tenderSaleDeadline', 'publicityEndTime', 'backDate',
+]
+
+# 详情链接 (与 crawler.format_item_details 中的链接格式一致)
+BASE_URL = 'https://b2b.10086.cn'
+LINK_PARAMS = [('publishId', 'id'), ('publishUuid', 'uuid'), ('publishType', 'publishType'), ('publishOneType', 'publishOneType')]
+
+# 图表只统计该日期之后的记录 (与 crawler.ROLLUP_CUTOFF_DATE 一致)
+ROLLUP_CUTOFF_DATE = "2024-01-01"
+
+DAY_MAP = {'Monday': '周一', 'Tuesday': '周二', 'Wednesday': '周三', 'Thursday': '周四', 'Friday': '周五', 'Saturday': '周六', 'Sunday': '周日'}
+DAY_ORDER = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
+_cache = {}
+_cache_lock = threading.Lock()
+_key_locks = {}
+
+
+def file_signature(*paths):
+    """文件版本签名：(路径, mtime_ns, 大小)，文件不存在时对应项为 None。"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def get_cached(key, paths, loader):
+    """
+    按 key 缓存 loader() 的结果，paths 中任一文件的签名变化时重新加载。
+    同一 key 的并发请求只会触发一次加载，其余请求等待并复用结果。
+    """
+    signature = file_signature(*paths)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+        value = loader()
+        with _cache_lock:
+            _cache[key] = (signature, value)
+        return value
+
+
+# --- RAW LOADERS ---
+
+def read_metadata():
+    """Loads the last successful crawl time for all tasks."""
+    if os.path.exists(METADATA_PATH):
+        try:
+            with open(METADATA_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def get_dataset_paths(task_name):
+    """JSON 基础快照、Parquet 文件和所有增量文件 (用于文件版本签名)。"""
+    output_path = os.path.join(OUTPUT_DIR, f"{task_name}.json")
+    return (output_path, os.path.join(OUTPUT_DIR, f"{task_name}.parquet")) + tuple(path for _, path in get_delta_paths(output_path))
+
+
+def read_data(task_name, columns=STATISTICS_COLUMNS):
+    """
+    Loads a dataset as a DataFrame, reading only the requested columns.
+    Prefers the columnar Parquet file written by the crawler and falls back to
+    the JSON snapshot (with its delta files replayed) when the Parquet file is
+    missing, unreadable or was built from a different dataset version (the
+    dataset_version stored in its metadata; mtimes are meaningless after a git checkout).
+    """
+    output_path, columnar_path, *_ = get_dataset_paths(task_name)
+
+    if os.path.exists(columnar_path):
+        try:
+            schema = pq.read_schema(columnar_path)
+            version = (schema.metadata or {}).get(b"dataset_version")
+            if version and version.decode('utf-8') == dataset_version(output_path):
+                return pd.read_parquet(columnar_path, columns=[col for col in columns if col in schema.names])
+        except Exception:
+            pass
+
+    if os.path.exists(output_path):
+        try:
+            df = pd.DataFrame(read_snapshot(output_path))
+            return df[[col for col in columns if col in df.columns]]
+        except Exception:
+            return None
+    return None
+
+
+def get_rollups_path(task_name):
+    return os.path.join(OUTPUT_DIR, f"{task_name}.rollups.json")
+
+
+def read_rollups(task_name):
+    """
+    读取爬虫生成的预聚合统计；文件缺失、损坏或其中的 dataset_version 与当前数据集不一致时返回 None
+    (按版本而不是 mtime 判断，git 检出后所有文件的 mtime 都是检出时间)。
+    """
+    rollups_path = get_rollups_path(task_name)
+    if not os.path.exists(rollups_path):
+        return None
+    try:
+        with open(rollups_path, 'r', encoding='utf-8') as f:
+            rollups = json.load(f)
+    except Exception:
+        return None
+    output_path, *_ = get_dataset_paths(task_name)
+    if rollups.get("dataset_version") != dataset_version(output_path):
+        return None
+    return rollups
+
+
+def coarse_rollups(days, counts):
+    """
+    按日计数 (datetime64[D] 升序数组 + 计数) 汇总为按周 (周一为键) 和按月 (1 日为键) 的计数，
+    与 crawler.RollupAccumulator 的 weekly / monthly 结构一致。
+    """
+    days = np.asarray(days, dtype='datetime64[D]')
+    counts = np.asarray(counts, dtype=np.int64)
+    # 1970-01-01 为周四，(天数 + 3) % 7 即以周一为 0 的星期
+    weeks = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    months = days.astype('datetime64[M]').astype('datetime64[D]')
+    result = {}
+    for name, buckets in (("weekly", weeks), ("monthly", months)):
+        keys, inverse = np.unique(buckets, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts, minlength=len(keys)) if len(keys) else []
+        result[name] = {str(key): int(total) for key, total in zip(keys, totals) if total}
+    return result
+
+
+def with_coarse_rollups(rollups):
+    """旧版预聚合文件没有 weekly / monthly 时从 daily 补齐。"""
+    if rollups is None or ("weekly" in rollups and "monthly" in rollups):
+        return rollups
+    daily = rollups.get("daily") or {}
+    return {**rollups, **coarse_rollups(list(daily.keys()), list(daily.values()))}
+
+
+def compute_rollups(df):
+    """从已类型化的数据集计算与 crawler.build_rollups 相同结构的统计 (预聚合文件不可用时的回退)。"""
+    if df is None:
+        return None
+    units = df['companyTypeName'].value_counts() if 'companyTypeName' in df.columns else pd.Series(dtype=int)
+    units = {unit: int(count) for unit, count in units.items() if count and unit}
+    if df.empty or 'PublishDateTime' not in df.columns:
+        return {"cutoff": ROLLUP_CUTOFF_DATE, "total": len(df), "filtered": 0, "daily": {}, "weekly": {}, "monthly": {}, "hourly": [0] * 24,
+                "hour_weekday": [[0] * 7 for _ in range(24)], "units": units, "first_day": None, "last_day": None}
+    filtered = df[df['PublishDateTime'] >= pd.Timestamp(ROLLUP_CUTOFF_DATE)]
+    daily = filtered['PublishDateTime'].dt.strftime('%Y-%m-%d').value_counts().sort_index()
+    hourly = filtered['PublishHour'].value_counts().reindex(range(24), fill_value=0)
+    hour_weekday = (
+        filtered.groupby([filtered['PublishHour'], filtered['PublishDateTime'].dt.weekday]).size()
+        .unstack(fill_value=0).reindex(index=range(24), columns=range(7), fill_value=0)
+    )
+    return {
+        "cutoff": ROLLUP_CUTOFF_DATE,
+        "total": len(df),
+        "filtered": len(filtered),
+        "daily": {day: int(count) for day, count in daily.items()},
+        **coarse_rollups(daily.index.tolist(), daily.tolist()),
+        "hourly": [int(count) for count in hourly],
+        "hour_weekday": hour_weekday.astype(int).values.tolist(),
+        "units": units,
+        "first_day": df['PublishDateTime'].min().strftime('%Y-%m-%d') if df['PublishDateTime'].notna().any() else None,
+        "last_day": df['PublishDateTime'].max().strftime('%Y-%m-%d') if df['PublishDateTime'].notna().any() else None,
+    }
+
+
+class TimeIndex:
+    """
+    按发布时间预排序的索引，用于日期范围 + 单位筛选，无需对整个数据集做布尔过滤和重新分组。
+      - 行级：发布时间升序的时间戳、单位编码、小时、星期及对应的 DataFrame 行号，
+        日期范围由 numpy.searchsorted 二分定位为连续区间 [lo, hi)
+      - 日级：按 (日期, 单位) 计数的前缀和，任意日期范围内各单位 (及每日) 的记录数为前缀和之差
+    范围查询的代价为 O(log n + k)，k 为范围内的记录数 (或天数)。
+    """
+
+    def __init__(self, df):
+        times = df['PublishDateTime'].to_numpy(dtype='datetime64[ns]')
+        valid = np.flatnonzero(~np.isnat(times))
+        order = valid[np.argsort(times[valid], kind='stable')]
+        self.rows = order
+        self.times = times[order]
+        units = df['companyTypeName'] if 'companyTypeName' in df.columns else pd.Series(pd.Categorical([None] * len(df)))
+        units = units.astype('category')
+        self.units = list(units.cat.categories)
+        self.unit_codes = units.cat.codes.to_numpy()[order]  # 缺失单位编码为 -1
+        self.hours = df['PublishHour'].to_numpy()[order].astype(np.int64)
+        self.weekdays = pd.DatetimeIndex(self.times).weekday.to_numpy()
+
+        day_of_row = self.times.astype('datetime64[D]')
+        self.days, day_index = np.unique(day_of_row, return_inverse=True)
+        # 缺失单位单独占最后一列
+        day_unit_counts = np.zeros((len(self.days), len(self.units) + 1), dtype=np.int64)
+        np.add.at(day_unit_counts, (day_index, self.unit_codes), 1)
+        self.day_prefix = np.vstack([np.zeros((1, day_unit_counts.shape[1]), dtype=np.int64), np.cumsum(day_unit_counts, axis=0)])
+
+    def unit_codes_for(self, unit_names):
+        """单位名称列表转编码数组；None 或空列表表示全部单位。"""
+        if not unit_names:
+            return None
+        return np.array([self.units.index(unit) for unit in unit_names if unit in self.units], dtype=np.int64)
+
+    def row_range(self, start, end):
+        """发布时间在 [start, end) 内的行区间 [lo, hi) (按时间升序)。"""
+        return np.searchsorted(self.times, np.datetime64(start, 'ns'), 'left'), np.searchsorted(self.times, np.datetime64(end, 'ns'), 'left')
+
+    def rows_in(self, start, end, unit_names=None):
+        """范围内 (可选单位) 记录的 DataFrame 行号，按发布时间升序。"""
+        lo, hi = self.row_range(start, end)
+        rows = self.rows[lo:hi]
+        codes = self.unit_codes_for(unit_names)
+        if codes is not None:
+            rows = rows[np.isin(self.unit_codes[lo:hi], codes)]
+        return rows
+
+    def rollups(self, start, end, unit_names=None):
+        """返回与预聚合统计相同结构的筛选结果，供 show_statistics 直接绘图。"""
+        codes = self.unit_codes_for(unit_names)
+        columns = slice(None) if codes is None else codes
+
+        # 每日计数：日级前缀和在范围内逐日相减
+        day_lo, day_hi = np.searchsorted(self.days, np.datetime64(start, 'D')), np.searchsorted(self.days, np.datetime64(end, 'D'))
+        day_counts = np.diff(self.day_prefix[day_lo:day_hi + 1][:, columns], axis=0).sum(axis=1)
+        daily = {str(day): int(count) for day, count in zip(self.days[day_lo:day_hi], day_counts) if count}
+        coarse = coarse_rollups(self.days[day_lo:day_hi], day_counts)
+
+        # 小时 / 小时×星期：只扫描范围内的行
+        lo, hi = self.row_range(start, end)
+        hours, weekdays = self.hours[lo:hi], self.weekdays[lo:hi]
+        if codes is not None:
+            mask = np.isin(self.unit_codes[lo:hi], codes)
+            hours, weekdays = hours[mask], weekdays[mask]
+        hour_weekday = np.bincount(hours * 7 + weekdays, minlength=24 * 7).reshape(24, 7)
+        return {
+            "cutoff": str(np.datetime64(start, 'D')),
+            "total": len(self.rows),
+            "filtered": int(len(hours)),
+            "daily": daily,
+            **coarse,
+            "hourly": hour_weekday.sum(axis=1).tolist(),
+            "hour_weekday": hour_weekday.tolist(),
+        }
+
+
+def read_crawl_metrics():
+    """读取所有运行指标 (旧文件在前)，跳过损坏的行；没有指标时返回空 DataFrame。"""
+    rows = []
+    for path in CRAWL_METRICS_PATHS:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df['time'] = pd.to_datetime(df['time'], errors='coerce')
+        df = df.sort_values('time', kind='stable').reset_index(drop=True)
+    return df
+
+
+def get_deadline_index_path(task_key):
+    # 爬虫为开启 deadlines 的任务维护的截止时间索引 (与 crawler.get_deadline_index_path 一致)
+    return os.path.join(OUTPUT_DIR, f"{task_key.lower()}_deadlines.json")
+
+
+def read_deadline_index(task_key):
+    """
+    读取截止时间索引中尚未截止的条目 (待提醒 + 已提醒)，返回按截止时间升序的 DataFrame
+    (列：deadline, field, id, deadline_time)；索引不存在时返回 None。
+    """
+    try:
+        with open(get_deadline_index_path(task_key), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entries = (index.get("pending") or []) + (index.get("alerted") or [])
+    df = pd.DataFrame(entries, columns=['deadline', 'field', 'id']).drop_duplicates()
+    df['deadline_time'] = pd.to_datetime(df['deadline'], errors='coerce')
+    return df.dropna(subset=['deadline_time']).sort_values('deadline_time', kind='stable').reset_index(drop=True)
+
+
+def read_change_times(task_key):
+    """
+    从历史库 (只读) 读取一个任务所有记录的 id、最近变化时间 (last_seen) 和下线时间 (removed_at)，
+    返回 DataFrame；历史库不存在或无法读取时返回 None。
+    """
+    if not os.path.exists(HISTORY_DB_PATH):
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{HISTORY_DB_PATH}?mode=ro", uri=True)) as conn:
+            rows = conn.execute("SELECT id, last_seen, removed_at FROM records WHERE task = ? ORDER BY id", (task_key,)).fetchall()
+    except sqlite3.Error:
+        return None
+    return pd.DataFrame(rows, columns=['id', 'last_seen', 'removed_at'])
+
+
+def get_detail_path(uuid):
+    """详情缓存路径 (与 crawler.get_detail_path 一致)。"""
+    digest = hashlib.sha1(str(uuid).encode('utf-8')).hexdigest()
+    return os.path.join(DETAIL_CACHE_DIR, digest[:2], f"{digest}.json")
+
+
+def read_detail_summary(path):
+    """读取一个详情缓存文件的摘要；文件不存在或损坏时返回空字典。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("summary") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def build_links(df):
+    """向量化构造详情链接列：缺失的参数 (None/NaN) 输出为空字符串。"""
+    links = pd.Series(f"{BASE_URL}/#/noticeDetail?", index=df.index, dtype=object)
+    for i, (param, column) in enumerate(LINK_PARAMS):
+        values = df[column].astype(object) if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        values = values.where(values.notna(), '').astype(str)
+        links = links + ('&' if i else '') + param + '=' + values
+    return links
+
+
+def prepare_dataset(df):
+    """一次性完成类型转换：解析发布时间、派生日期/时刻/星期列、构造详情链接，单位列存为分类类型。"""
+    if df is None or df.empty or 'publishDate' not in df.columns:
+        return df
+    df = df.copy()
+    df['LINK'] = build_links(df)
+    df['PublishDateTime'] = pd.to_datetime(df['publishDate'], errors='coerce')
+    df['PublishDateOnly'] = df['PublishDateTime'].dt.date
+    df['PublishHour'] = df['PublishDateTime'].dt.hour
+    df['PublishDayOfWeek'] = pd.Categorical(df['PublishDateTime'].dt.day_name().map(DAY_MAP), categories=DAY_ORDER, ordered=True)
+    if 'companyTypeName' in df.columns:
+        df['companyTypeName'] = df['companyTypeName'].astype('category')
+    return df
+
+
+# --- SHARED ACCESSORS ---
+
+def load_metadata():
+    return get_cached(("metadata",), [METADATA_PATH], read_metadata)
+
+
+def load_rollups(task_name):
+    """返回图表所需的预聚合统计 (共享只读)，优先使用爬虫生成的文件，否则从数据集计算。"""
+    def loader():
+        rollups = read_rollups(task_name)
+        return with_coarse_rollups(rollups) if rollups is not None else compute_rollups(load_dataset(task_name))
+    return get_cached(("rollups", task_name), (get_rollups_path(task_name),) + get_dataset_paths(task_name), loader)
+
+
+def load_crawl_metrics():
+    """返回所有运行指标 (共享只读)。"""
+    return get_cached(("crawl_metrics",), CRAWL_METRICS_PATHS, read_crawl_metrics)
+
+
+def build_search_index(df):
+    """从已加载的数据集建立标题/单位的全文检索索引；数据集不存在时返回 None。"""
+    if df is None or 'id' not in df.columns:
+        return None
+    columns = [df[column].astype(object).where(df[column].notna(), None) if column in df.columns else [None] * len(df)
+               for column in ('name', 'companyTypeName', 'publishDate')]
+    return SearchIndex.build(zip(df['id'], *columns))
+
+
+def load_search_index(task_name):
+    """返回全文检索索引 (共享只读)，每个数据集文件版本只从共享数据集建立一次。"""
+    return get_cached(("search", task_name), get_dataset_paths(task_name), lambda: build_search_index(load_dataset(task_name)))
+
+
+def load_records_by_id(task_name, record_ids):
+    """按 id 列表 (保持顺序) 从共享数据集中取出记录，id 到行号的映射每个文件版本只建立一次。"""
+    df = load_dataset(task_name)
+    if df is None or 'id' not in df.columns:
+        return None
+    id_index = get_cached(("id_index", task_name), get_dataset_paths(task_name), lambda: pd.Index(df['id']))
+    positions = id_index.get_indexer(record_ids)
+    return df.iloc[positions[positions >= 0]]
+
+
+def load_deadline_index(task_key):
+    """返回任务的截止时间索引 (共享只读)，文件不存在时返回 None。"""
+    path = get_deadline_index_path(task_key)
+    return get_cached(("deadlines", task_key), [path], lambda: read_deadline_index(task_key))
+
+
+def load_detail_summaries(uuids):
+    """
+    返回各 uuid 的详情摘要列表 (与 uuids 顺序一致，未缓存时为空字典)。
+    每个缓存文件按文件版本单独缓存，调用方只应传入当前显示的一页记录。
+    """
+    summaries = []
+    for uuid in uuids:
+        if not isinstance(uuid, str) or not uuid:
+            summaries.append({})
+            continue
+        path = get_detail_path(uuid)
+        summaries.append(get_cached(("detail", uuid), [path], lambda path=path: read_detail_summary(path)))
+    return summaries
+
+
+def changes_from_log(change_log, since):
+    """按 seq 顺序重放 since 之后的增量，同一 id 以最后一次变化为准 (删除后重新出现的记录算作变化)。"""
+    status = {}
+    for time, changed_ids, removed_ids in change_log[1]:
+        if time and time > since:
+            status.update(dict.fromkeys(changed_ids, True))
+            status.update(dict.fromkeys(removed_ids, False))
+    return [record_id for record_id, online in status.items() if online], [record_id for record_id, online in status.items() if not online]
+
+
+def load_changes_since(task_key, task_name, since):
+    """
+    since (CST，"%Y-%m-%d %H:%M:%S") 之后新增或内容变化的在线记录 id 和下线的记录 id，返回 (变化 id 列表, 下线 id 列表)。
+    优先使用随仓库提交的快照增量文件 (CRAWLER_DATASET_STORAGE=delta)，since 早于基础快照时间 (更早的变化已被压缩) 或
+    数据集为旧版 JSON 数组时改用历史库；都无法回答时返回 None。
+    变化记录和历史库的变化时间表都按任务只缓存一份 (文件更新后自动失效)，since 在查到后再筛选，
+    客户端传入的不同 since 不会各占一个缓存条目。
+    """
+    output_path, *_ = get_dataset_paths(task_name)
+    change_log = get_cached(("change_log", task_name), get_dataset_paths(task_name), lambda: read_change_log(output_path))
+    if change_log is not None and change_log[0] and since >= change_log[0]:
+        return changes_from_log(change_log, since)
+
+    times = get_cached(("change_times", task_key), [HISTORY_DB_PATH], lambda: read_change_times(task_key))
+    if times is None:
+        return None
+    removed = times['removed_at'].notna()
+    changed_ids = times.loc[~removed & (times['last_seen'] > since), 'id'].tolist()
+    removed_ids = times.loc[removed & (times['removed_at'] > since), 'id'].tolist()
+    return changed_ids, removed_ids
+
+
+def load_sort_order(task_name, column, descending=False):
+    """
+    返回按 column 排序的行号数组 (共享只读，每个文件版本每种排序只计算一次)，缺失值始终排在最后。
+    数据集不可用或没有该列时返回 None。
+    """
+    def loader():
+        df = load_dataset(task_name)
+        if df is None or column not in df.columns:
+            return None
+        values = df[column].reset_index(drop=True)
+        return values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+    return get_cached(("sort", task_name, column, descending), get_dataset_paths(task_name), loader)
+
+
+def load_time_index(task_name):
+    """返回数据集的发布时间排序索引 (共享只读)，数据集不可用时返回 None。"""
+    def loader():
+        df = load_dataset(task_name)
+        if df is None or df.empty or 'PublishDateTime' not in df.columns:
+            return None
+        return TimeIndex(df)
+    return get_cached(("time_index", task_name), get_dataset_paths(task_name), loader)
+
+
+def load_dataset(task_name):
+    """返回已类型化的共享数据集 (只读)，文件不存在或无法解析时返回 None。"""
+    return get_cached(("dataset", task_name), get_dataset_paths(task_name), lambda: prepare_dataset(read_data(task_name)))
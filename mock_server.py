@@ -0,0 +1,245 @@
+# mock_server.py
+
+"""
+本地 queryList 替身服务器，用于在不访问 b2b.10086.cn 的情况下测试和压测爬虫。
+
+实现 crawler.scrape_content 依赖的 POST 接口约定：
+  - 请求体 JSON 中的 size / current 分页参数
+  - homePageQueryType=Bidding (截标时间未到) 和 companyType 过滤
+  - 响应 {"data": {"content": [...], "totalElements": N, ...}}
+另提供详情接口 (路径以 /queryDetail 结尾，请求体为 publishUuid 等详情页链接参数)，
+返回记录本身及生成的预算、采购方式和联系人字段，供 crawler.enrich_details 测试。
+记录由 generate_records 按 zgyd/ 中真实记录的 58 字段结构生成，可配置记录数、延迟和错误注入。
+
+用法：
+  python mock_server.py --records 10000 --latency 0.05 --error-rate 0.01
+  CRAWLER_POST_URL=http://127.0.0.1:8765/queryList python crawler.py TASK_1
+  CRAWLER_DETAIL_URL=http://127.0.0.1:8765/queryDetail python crawler.py TASK_3
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from snapshot_store import read_snapshot
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zgyd")
+
+# companyType 查询参数与单位名称的对应关系 (爬虫目前只用到北京)
+COMPANY_TYPES = {"BJ": "北京"}
+
+# 公示截止时间的哨兵值 (真实数据中约九成记录为该值)
+SENTINEL_TIME = "1900-01-01 00:00:00"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- FIXTURE GENERATOR ---
+
+def load_real_records(fixture_dir=FIXTURE_DIR):
+    """读取 zgyd/ 下所有数据集文件 (快照重放增量后) 中的真实记录，跳过增量、元数据、索引和统计文件。"""
+    records = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.json"))):
+        if ".delta." in os.path.basename(path):
+            continue
+        try:
+            data = read_snapshot(path)
+        except Exception:
+            continue
+        records.extend(item for item in data if isinstance(item, dict) and 'id' in item)
+    return records
+
+
+def generate_records(count, seed=0, fixture_dir=FIXTURE_DIR, now=None):
+    """
+    按真实记录结构生成 count 条合成记录，按发布时间倒序排列 (与接口返回顺序一致)。
+    字段集合、空值字段和枚举值取自真实记录，单位按真实分布抽样；生成结果只由 seed 决定。
+    """
+    real_records = load_real_records(fixture_dir)
+    if not real_records:
+        raise FileNotFoundError(f"{fixture_dir} 中没有可用作模板的真实记录。")
+
+    rng = random.Random(seed)
+    template = {key: None for key in real_records[0]}
+    units = Counter(item.get('companyTypeName') for item in real_records if item.get('companyTypeName'))
+    unit_names, unit_weights = list(units), list(units.values())
+    titles = [item['name'] for item in real_records if item.get('name')]
+    enum_fields = ['publishType', 'publishOneType', 'publishType_dictText', 'publishOneType_dictText']
+    enum_values = [{field: item.get(field) for field in enum_fields} for item in real_records]
+
+    now = now or datetime.now()
+    publish_time = now
+    base_id = 1980000000000000000
+    records = []
+    for i in range(count):
+        # 平均约 10 分钟一条，10 万条约覆盖两年
+        publish_time -= timedelta(seconds=rng.randint(1, 1200))
+        sale_deadline = publish_time + timedelta(days=rng.randint(5, 10), hours=rng.randint(0, 8))
+        item = dict(template)
+        item.update(rng.choice(enum_values))
+        item.update({
+            "id": str(base_id - i * 1000 - rng.randint(0, 999)),
+            "uuid": uuid.UUID(int=rng.getrandbits(128)).hex,
+            "name": f"{rng.choice(titles)}_{i}",
+            "companyTypeName": rng.choices(unit_names, weights=unit_weights)[0],
+            "publishDate": publish_time.strftime(TIME_FORMAT),
+            "tenderSaleDeadline": sale_deadline.strftime(TIME_FORMAT),
+            "backDate": (sale_deadline + timedelta(days=rng.randint(3, 15))).strftime(TIME_FORMAT),
+            "publicityEndTime": SENTINEL_TIME if rng.random() < 0.9 else (sale_deadline + timedelta(days=3)).strftime(TIME_FORMAT),
+        })
+        records.append(item)
+    return records
+
+
+# --- SERVER ---
+
+class QueryListServer(ThreadingHTTPServer):
+    """
+    queryList 替身服务器。
+    latency: 每个请求的基础延迟 (秒，±50% 抖动)；error_rate: 返回 error_status 的概率。
+    统计 requests / errors / bytes_sent，供压测脚本读取。
+    """
+    daemon_threads = True
+
+    def __init__(self, address, records, latency=0.0, error_rate=0.0, error_status=500):
+        super().__init__(address, QueryListHandler)
+        self.records = records
+        self.records_by_uuid = {item.get("uuid"): item for item in records}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.requests = 0
+            self.errors = 0
+            self.bytes_sent = 0
+
+    def query(self, body):
+        """按请求参数过滤并分页，返回响应 JSON。"""
+        records = self.records
+        if body.get("homePageQueryType") == "Bidding":
+            now_str = datetime.now().strftime(TIME_FORMAT)
+            records = [item for item in records if (item.get("backDate") or "") >= now_str]
+        if body.get("companyType"):
+            unit = COMPANY_TYPES.get(body["companyType"])
+            records = [item for item in records if item.get("companyTypeName") == unit]
+
+        size = max(int(body.get("size") or 10), 1)
+        current = max(int(body.get("current") or 1), 1)
+        stime = int(time.time() * 1000)
+        content = [
+            dict(item, size=size, pageSize=size, current=current, pageNum=current, total=0, stime=stime)
+            for item in records[(current - 1) * size: current * size]
+        ]
+        return {
+            "code": 200,
+            "data": {"content": content, "totalElements": len(records), "totalPages": -(-len(records) // size), "size": size, "number": current},
+        }
+
+    def detail(self, body):
+        """按 publishUuid 返回详情 JSON，找不到时 data 为 null。"""
+        item = self.records_by_uuid.get(body.get("publishUuid"))
+        if item is None:
+            return {"code": 200, "data": None}
+        rng = random.Random(item["uuid"])
+        return {
+            "code": 200,
+            "data": dict(
+                item,
+                budgetAmount=f"{rng.randint(1, 500) * 10000}",
+                purchaseMethod=rng.choice(["公开招标", "邀请招标", "竞争性谈判", "单一来源采购"]),
+                contactPerson=rng.choice(["张工", "李工", "王经理"]),
+                contactPhone=f"010-{rng.randint(10000000, 99999999)}",
+            ),
+        }
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/queryList"
+
+    @property
+    def detail_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/queryDetail"
+
+    def start(self):
+        """在后台线程中运行，返回自身。"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class QueryListHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b"{}")
+        except json.JSONDecodeError:
+            self.send_error(400)
+            return
+
+        if server.latency > 0:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+
+        if server.error_rate > 0 and random.random() < server.error_rate:
+            with server.stats_lock:
+                server.requests += 1
+                server.errors += 1
+            self.send_response(server.error_status)
+            self.end_headers()
+            return
+
+        response = server.detail(body) if self.path.rstrip('/').endswith('/queryDetail') else server.query(body)
+        payload = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        with server.stats_lock:
+            server.requests += 1
+            server.bytes_sent += len(payload)
+
+
+def start_server(records, port=0, latency=0.0, error_rate=0.0, error_status=500):
+    """启动后台替身服务器 (port=0 时自动分配端口)。"""
+    return QueryListServer(("127.0.0.1", port), records, latency, error_rate, error_status).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 queryList 替身服务器")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--records", type=int, default=300, help="生成的记录数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟 (秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的概率")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--dump", help="将生成的记录写入该 JSON 文件后退出")
+    args = parser.parse_args()
+
+    fixture = generate_records(args.records, seed=args.seed)
+    if args.dump:
+        with open(args.dump, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, indent=4, ensure_ascii=False)
+        print(f"已写入 {len(fixture)} 条记录到 {args.dump}")
+        raise SystemExit(0)
+
+    server = QueryListServer(("127.0.0.1", args.port), fixture, args.latency, args.error_rate, args.error_status)
+    print(f"queryList 替身服务器已启动：{server.url} ({len(fixture)} 条记录)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
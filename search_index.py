@@ -0,0 +1,103 @@
+# search_index.py
+
+"""
+标题 (name) 和单位 (companyTypeName) 的全文检索倒排索引。
+
+中文无需分词：文本按字符二元组 (bigram) 切分，每个二元组对应包含它的文档编号列表 (升序)。
+查询时对所有查询词的二元组取交集，再用原文做子串校验排除误匹配。
+索引由 app.py 从已加载的数据集在内存中建立 (dataset_cache 按数据集文件版本缓存，每个版本只建立一次)，
+不写入文件，避免每次抓取都提交整份索引。
+"""
+
+import numpy as np
+
+NGRAM_SIZE = 2
+
+
+def normalize(text):
+    return (text or "").lower()
+
+
+def ngrams(text):
+    """文本的字符二元组集合 (跳过含空白的组合)；不足两个字符时返回文本本身。"""
+    text = normalize(text)
+    if len(text) < NGRAM_SIZE:
+        return {text} if text.strip() else set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1) if not any(ch.isspace() for ch in text[i:i + NGRAM_SIZE])}
+
+
+def doc_grams(name, unit):
+    return ngrams(name) | ngrams(unit)
+
+
+# --- INDEX ---
+
+class SearchIndex:
+    """只读查询端：倒排表为 numpy 数组，结果按发布时间倒序返回。"""
+
+    def __init__(self, docs, postings):
+        """docs: [[id, name, companyTypeName, publishDate], ...]；postings: {二元组: 升序的文档编号列表}。"""
+        self.live_docs = np.arange(len(docs), dtype=np.int64)
+        self.ids = [doc[0] for doc in docs]
+        self.names = [normalize(doc[1]) for doc in docs]
+        self.units = [normalize(doc[2]) for doc in docs]
+        self.postings = {gram: np.array(doc_list, dtype=np.int64) for gram, doc_list in postings.items()}
+        # 文档编号按发布时间倒序的排名，用于对结果排序
+        order = sorted(range(len(docs)), key=lambda i: docs[i][3] or "", reverse=True)
+        self.rank = np.zeros(len(docs), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+    @classmethod
+    def build(cls, records):
+        """records: 数据集的全部 (id, name, companyTypeName, publishDate)，重复的 id 只保留第一条。"""
+        docs, postings, seen = [], {}, set()
+        for record_id, name, unit, publish_date in records:
+            if record_id in seen:
+                continue
+            seen.add(record_id)
+            for gram in doc_grams(name, unit):
+                postings.setdefault(gram, []).append(len(docs))
+            docs.append([record_id, name, unit, publish_date])
+        return cls(docs, postings)
+
+    def __len__(self):
+        return len(self.live_docs)
+
+    def search(self, query):
+        """
+        多个查询词 (空格分隔) 之间为“与”关系，每个词须出现在标题或单位中。
+        返回匹配记录的 id 列表，按发布时间倒序。
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return []
+
+        # 单字查询词没有二元组，只能在候选集上做子串校验
+        grams = set()
+        for term in terms:
+            if len(term) >= NGRAM_SIZE:
+                grams |= ngrams(term)
+        posting_lists = []
+        for gram in grams:
+            doc_list = self.postings.get(gram)
+            if doc_list is None:
+                return []
+            posting_lists.append(doc_list)
+
+        # 从最短的倒排表开始求交集 (倒排表中只有在线文档)；全部为单字查询词时从所有在线文档开始
+        posting_lists.sort(key=len)
+        candidates = posting_lists[0] if posting_lists else self.live_docs
+        for doc_list in posting_lists[1:]:
+            candidates = np.intersect1d(candidates, doc_list, assume_unique=True)
+            if not len(candidates):
+                return []
+
+        # 长度恰好为二元组的查询词已由倒排表精确匹配，其余查询词需要校验原文 (二元组可能不连续出现)
+        check_terms = [term for term in terms if len(term) != NGRAM_SIZE]
+        if check_terms:
+            candidates = np.array(
+                [doc for doc in candidates.tolist() if all(term in self.names[doc] or term in self.units[doc] for term in check_terms)],
+                dtype=np.int64,
+            )
+        candidates = candidates[np.argsort(self.rank[candidates], kind='stable')]
+        return [self.ids[doc] for doc in candidates.tolist()]
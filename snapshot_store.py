@@ -0,0 +1,407 @@
+# snapshot_store.py
+
+"""
+确定性紧凑快照 + 每次运行的增量文件，减少定时任务每次提交数据集时的 git 变动。
+由爬虫的 CRAWLER_DATASET_STORAGE=delta 启用 (默认仍写出旧版 JSON 数组)；读取函数同时支持两种格式。
+
+基础快照 (<数据集>.json)：记录按 id 升序，每条记录一行，去掉值为 null 的字段和 VOLATILE 字段，
+键按 fields 中的顺序输出；同样的数据总是得到逐字节相同的文件。
+  {"version":1,"seq":N,"time":"...","count":M,"fields":[...],"records":[
+  {"id":"...",...},
+  ...
+  ]}
+fields 为全部字段 (首次出现顺序，包括在所有记录中都为 null 的字段)，读取时据此把省略的字段补回 null，
+与原始记录的键集合一致。time 为写出基础快照时已包含的最后一次变化的时间 (此前的变化不再逐条保留)。
+
+增量文件 (<数据集>.delta.<seq>.json)：相对上一状态的变化，只在有变化时写出：
+  {"version":1,"seq":N,"time":"...","fields":[...],"added":[记录,...],"changed":[合并补丁,...],"removed":[id,...]}
+changed 为 JSON Merge Patch (RFC 7386)：只含 id 和变化的字段，值为 null 表示删除该字段。
+读取时把 seq 大于基础快照 seq 的增量文件按顺序重放到基础快照上；重放是幂等的，
+压缩 (把所有增量并入新的基础快照并删除增量文件) 中途失败不会导致数据错误。
+基础快照的 time 和增量文件中的 id 同时构成一份变化记录 (read_change_log)，api.py 据此回答 since 查询。
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+SNAPSHOT_VERSION = 1
+# 增量文件数量或增量条目占快照记录数的比例超过阈值时压缩
+COMPACT_MAX_DELTAS = int(os.environ.get("CRAWLER_COMPACT_MAX_DELTAS", "96"))
+COMPACT_MAX_RATIO = 0.25
+RECORDS_KEY = '"records":['
+DELTA_KEYS = ("added", "changed", "removed")
+
+
+def encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def sparse_record(item, fields, drop_fields=()):
+    """
+    去掉 null 值和 drop_fields 后的记录，键按 fields 顺序排列。
+    新字段 (包括值为 null 的) 追加到 fields 末尾，读取时才能把它们补回。
+    """
+    for key in item:
+        if key not in drop_fields and key not in fields:
+            fields.append(key)
+    return {key: item[key] for key in fields if item.get(key) is not None and key not in drop_fields}
+
+
+def merge_patch(old, new):
+    """old -> new 的合并补丁 (不含 id 以外未变化的字段)，无变化时返回 None。"""
+    patch = {key: value for key, value in new.items() if old.get(key) != value}
+    patch.update({key: None for key in old if key not in new})
+    if not patch:
+        return None
+    return dict({'id': new['id']}, **patch)
+
+
+def apply_patch(record, patch):
+    record = dict(record)
+    for key, value in patch.items():
+        if value is None:
+            record.pop(key, None)
+        else:
+            record[key] = value
+    return record
+
+
+# --- FILE LAYOUT ---
+
+def get_delta_paths(path):
+    """path 对应的所有增量文件 [(seq, 路径), ...]，按 seq 升序。"""
+    base, _ = os.path.splitext(path)
+    deltas = []
+    for delta_path in glob.glob(glob.escape(base) + ".delta.*.json"):
+        match = re.search(r"\.delta\.(\d+)\.json$", delta_path)
+        if match:
+            deltas.append((int(match.group(1)), delta_path))
+    return sorted(deltas)
+
+
+def get_delta_path(path, seq):
+    return f"{os.path.splitext(path)[0]}.delta.{seq:06d}.json"
+
+
+def read_base(path):
+    """
+    读取基础快照，返回 (头部, 记录迭代器)；旧版 JSON 数组文件的头部为 None (记录已按 id 排序)。
+    文件不存在时返回 (None, 空迭代器)，不是数据集文件时抛出 ValueError。
+    """
+    if not os.path.exists(path):
+        return None, iter(())
+    f = open(path, 'r', encoding='utf-8')
+    first_line = f.readline()
+    if first_line.lstrip().startswith('['):
+        # 旧版格式 (indent=4 的 JSON 数组)：整体读取
+        f.seek(0)
+        with f:
+            records = json.load(f)
+        return None, iter(sorted((item for item in records if isinstance(item, dict) and 'id' in item), key=lambda item: str(item['id'])))
+    if not first_line.rstrip().endswith(RECORDS_KEY):
+        f.close()
+        raise ValueError(f"{path} 不是快照文件")
+    header = json.loads(first_line.rstrip()[:-len(RECORDS_KEY)].rstrip(',') + "}")
+
+    def iter_records():
+        with f:
+            for line in f:
+                line = line.rstrip().rstrip(',')
+                if line == ']}':
+                    break
+                if line:
+                    yield json.loads(line)
+    return header, iter_records()
+
+
+def read_header(path):
+    """只读取基础快照的头部；旧版 JSON 数组、不是数据集文件或文件不存在时返回 None。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            first_line = f.readline().rstrip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not first_line.endswith(RECORDS_KEY):
+        return None
+    return json.loads(first_line[:-len(RECORDS_KEY)].rstrip(',') + "}")
+
+
+def read_deltas(path, base_seq):
+    """读取 seq 大于 base_seq 的增量文件 [(seq, 增量), ...]。"""
+    deltas = []
+    for seq, delta_path in get_delta_paths(path):
+        if seq <= base_seq:
+            continue
+        with open(delta_path, 'r', encoding='utf-8') as f:
+            deltas.append((seq, json.load(f)))
+    return deltas
+
+
+def build_overlay(deltas):
+    """按顺序重放增量，得到 {id: 记录或补丁序列的结果}；值为 None 表示已删除。"""
+    overlay = {}
+    for _, delta in deltas:
+        for record in delta.get("added", []):
+            overlay[record['id']] = ("set", record)
+        for patch in delta.get("changed", []):
+            previous = overlay.get(patch['id'])
+            if previous is None or previous[0] == "patch":
+                patches = previous[1] if previous else []
+                overlay[patch['id']] = ("patch", patches + [patch])
+            else:
+                overlay[patch['id']] = ("set", apply_patch(previous[1], patch))
+        for record_id in delta.get("removed", []):
+            overlay[record_id] = ("set", None)
+    return overlay
+
+
+class SnapshotState:
+    """基础快照 + 增量重放后的当前状态，按 id 升序流式迭代 (内存占用只与增量大小有关)。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.header, self._base_records = read_base(path)
+        self.legacy = self.header is None and os.path.exists(path)
+        self.base_seq = self.header["seq"] if self.header else 0
+        self.base_count = self.header["count"] if self.header else 0
+        self.deltas = read_deltas(path, self.base_seq)
+        self.fields = list(self.header["fields"]) if self.header else []
+        for _, delta in self.deltas:
+            self.fields.extend(field for field in delta.get("fields", []) if field not in self.fields)
+        self.overlay = build_overlay(self.deltas)
+
+    @property
+    def last_seq(self):
+        return max([self.base_seq] + [seq for seq, _ in self.deltas] + [seq for seq, _ in get_delta_paths(self.path)])
+
+    @property
+    def last_time(self):
+        """基础快照和增量中最晚的变化时间 (都没有时为 None)。"""
+        times = [delta.get("time") for _, delta in self.deltas] + [self.header.get("time") if self.header else None]
+        return max((time for time in times if time), default=None)
+
+    @property
+    def delta_entries(self):
+        return sum(len(delta.get(key, [])) for _, delta in self.deltas for key in DELTA_KEYS)
+
+    def records(self):
+        """按 id 升序迭代当前全部记录 (稀疏形式)：基础快照与增量中整条写入的记录做归并。只能迭代一次。"""
+        overlay = self.overlay
+        inserts = sorted(record_id for record_id, (kind, record) in overlay.items() if kind == "set" and record is not None)
+        position = 0
+        for record in self._base_records:
+            record_id = str(record['id'])
+            while position < len(inserts) and inserts[position] < record_id:
+                yield overlay[inserts[position]][1]
+                position += 1
+            change = overlay.get(record_id)
+            if change is None:
+                yield record
+            elif change[0] == "patch":
+                for patch in change[1]:
+                    record = apply_patch(record, patch)
+                yield record
+            elif change[1] is not None:
+                # 整条替换的记录也在 inserts 中，此处即 inserts[position]
+                yield change[1]
+                position += 1
+        for record_id in inserts[position:]:
+            yield overlay[record_id][1]
+
+
+# --- WRITER ---
+
+def write_base(path, records, fields, seq, time=None):
+    """写出基础快照 (records 为按 id 升序的稀疏记录，可迭代一次)，返回记录数。先写临时文件再原子替换。"""
+    body_path = path + ".body.tmp"
+    count = 0
+    with open(body_path, 'w', encoding='utf-8') as body:
+        for record in records:
+            body.write(("\n" if count == 0 else ",\n") + encode(record))
+            count += 1
+    header = {"version": SNAPSHOT_VERSION, "seq": seq, "time": time, "count": count, "fields": fields}
+    if time is None:
+        del header["time"]
+    with open(path + ".tmp", 'w', encoding='utf-8') as f, open(body_path, 'r', encoding='utf-8') as body:
+        f.write(encode(header)[:-1] + "," + RECORDS_KEY)
+        shutil.copyfileobj(body, f)
+        f.write("\n]}\n")
+    os.remove(body_path)
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def remove_deltas(path, up_to_seq):
+    for seq, delta_path in get_delta_paths(path):
+        if seq <= up_to_seq:
+            os.remove(delta_path)
+
+
+class SnapshotWriter:
+    """
+    流式写出一个数据集的新状态 (记录须按 id 升序写入)，与上一状态 (基础快照 + 增量) 逐条归并对比：
+    commit() 时有变化则写出一个增量文件；没有基础快照、基础快照为旧版格式或需要压缩时改写基础快照。
+    """
+
+    def __init__(self, path, drop_fields=()):
+        self.path = path
+        self.drop_fields = set(drop_fields)
+        self.state = SnapshotState(path)
+        self.fields = list(self.state.fields)
+        # 旧版或不存在的基础快照直接整体改写，无需对比
+        self.rewrite = self.state.header is None
+        self._previous = None if self.rewrite else self.state.records()
+        self._previous_record = None
+        self._next_previous()
+        self._body_path = path + ".new.tmp"
+        self._body = open(self._body_path, 'w', encoding='utf-8')
+        self.count = 0
+        self.last_id = None
+        self.added, self.changed, self.removed = [], [], []
+
+    def _next_previous(self):
+        self._previous_record = next(self._previous, None) if self._previous is not None else None
+
+    def _drain_previous_before(self, record_id):
+        while self._previous_record is not None and (record_id is None or str(self._previous_record['id']) < record_id):
+            self.removed.append(self._previous_record['id'])
+            self._next_previous()
+
+    def write(self, item):
+        record_id = str(item['id'])
+        if self.last_id is not None and record_id <= self.last_id:
+            if record_id == self.last_id:
+                return  # 重复 id 只保留第一条
+            raise ValueError(f"快照记录须按 id 升序写入: {self.last_id} -> {record_id}")
+        self.last_id = record_id
+        record = sparse_record(item, self.fields, self.drop_fields)
+        self._body.write(encode(record) + "\n")
+        self.count += 1
+        if self.rewrite:
+            return
+
+        self._drain_previous_before(record_id)
+        previous = self._previous_record
+        if previous is not None and str(previous['id']) == record_id:
+            patch = merge_patch(previous, record)
+            if patch is not None:
+                self.changed.append(patch)
+            self._next_previous()
+        else:
+            self.added.append(record)
+
+    def commit(self, now=None):
+        """
+        写出增量或改写基础快照，返回 ("delta" | "base" | None, 变化条目数)。
+        now 为本次变化的时间 (写入增量和基础快照的 time，应与 since 查询使用同一时区)。
+        """
+        self._drain_previous_before(None)
+        self._body.close()
+        changes = len(self.added) + len(self.changed) + len(self.removed)
+        state = self.state
+        time = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        compact = self.rewrite or (
+            changes and (len(state.deltas) + 1 >= COMPACT_MAX_DELTAS or state.delta_entries + changes > COMPACT_MAX_RATIO * max(state.base_count, 1))
+        )
+        try:
+            if compact:
+                seq = state.last_seq + (1 if changes else 0)
+                with open(self._body_path, 'r', encoding='utf-8') as body:
+                    # 没有变化时沿用原基础快照和增量中的时间，变化记录不会因改写而提前截断
+                    write_base(self.path, (json.loads(line) for line in body), self.fields, seq, time if changes or self.rewrite else state.last_time)
+                remove_deltas(self.path, seq)
+                return "base", changes
+            if not changes:
+                return None, 0
+            seq = state.last_seq + 1
+            delta = {
+                "version": SNAPSHOT_VERSION, "seq": seq, "time": time,
+                "fields": self.fields, "added": self.added, "changed": self.changed, "removed": self.removed,
+            }
+            delta_path = get_delta_path(self.path, seq)
+            with open(delta_path + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(encode_delta(delta))
+            os.replace(delta_path + ".tmp", delta_path)
+            return "delta", changes
+        finally:
+            os.remove(self._body_path)
+
+    def abort(self):
+        self._body.close()
+        if os.path.exists(self._body_path):
+            os.remove(self._body_path)
+
+
+def encode_delta(delta):
+    """增量文件：头部字段一行，每个条目一行。"""
+    text = encode({key: value for key, value in delta.items() if key not in DELTA_KEYS})[:-1]
+    for key in DELTA_KEYS:
+        entries = delta[key]
+        text += f',\n"{key}":[' + "".join(("\n" if i == 0 else ",\n") + encode(entry) for i, entry in enumerate(entries)) + ("\n]" if entries else "]")
+    return text + "}\n"
+
+
+# --- READER ---
+
+def read_snapshot(path):
+    """
+    返回数据集当前的全部记录 (按 id 升序，省略的字段补回 null)；旧版 JSON 数组原样返回。
+    文件不存在或不是数据集文件时返回 []。
+    """
+    try:
+        state = SnapshotState(path)
+    except (OSError, ValueError):
+        return []
+    if state.legacy:
+        return list(state.records())
+    return [{field: record.get(field) for field in state.fields} for record in state.records()]
+
+
+def dataset_version(path):
+    """
+    数据集内容的版本标识，供派生文件 (Parquet、预聚合统计) 判断是否与数据集一致 (不依赖 mtime，git 检出后 mtime 无意义)：
+    快照格式为最新的 seq (基础快照与增量文件中最大的)，旧版 JSON 数组为文件内容的 SHA-1。文件不存在时返回 None。
+    """
+    if not os.path.exists(path):
+        return None
+    header = read_header(path)
+    if header is not None:
+        return f"seq:{max([header['seq']] + [seq for seq, _ in get_delta_paths(path)])}"
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"sha1:{digest.hexdigest()}"
+
+
+def compact_snapshot(path, drop_fields=()):
+    """把所有增量并入基础快照并删除增量文件 (旧版 JSON 数组同时转换为快照格式)，返回是否进行了压缩。"""
+    state = SnapshotState(path)
+    if state.header is not None and not state.deltas:
+        return False
+    fields = list(state.fields)
+    records = (sparse_record(record, fields, set(drop_fields)) for record in state.records())
+    seq = state.last_seq
+    write_base(path, records, fields, seq, state.last_time)
+    remove_deltas(path, seq)
+    return True
+
+
+def read_change_log(path):
+    """
+    快照的变化记录：返回 (基础快照时间, [(时间, 新增或修改的 id 列表, 删除的 id 列表), ...按 seq 升序])。
+    基础快照时间之前的变化已并入基础快照，无法再区分；旧版 JSON 数组或文件不存在时返回 None。
+    """
+    header = read_header(path)
+    if header is None:
+        return None
+    entries = [
+        (delta.get("time"), [record['id'] for record in delta.get("added", [])] + [patch['id'] for patch in delta.get("changed", [])], list(delta.get("removed", [])))
+        for _, delta in read_deltas(path, header["seq"])
+    ]
+    return header.get("time"), entries
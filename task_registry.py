@@ -0,0 +1,61 @@
+# task_registry.py
+
+"""
+共享任务注册表：crawler.py、app.py 和 worker/index.js 都从 tasks.json 读取任务配置，不再各自维护一份。
+
+每个任务 (键为任务 ID，文件中的顺序即 app.py 的 Tab 顺序) 的字段：
+  name          数据集名称 (输出文件名和 Tab 名称)，必填
+  payload       queryList 查询参数，必填；按区域抓取时使用 companyType
+  incremental   增量模式，翻页到整页均为已知记录时停止，并将新记录合并进已有数据集
+  probe         抓取前先用小页探测首页指纹，与上次一致时跳过全量抓取 (每隔 FULL_REFRESH_HOURS 仍全量抓取一次)
+  local_filter  多任务合并运行时，用于从去掉 companyType 的更宽查询结果中本地派生本数据集，
+                例如 {"companyTypeName": "北京"}；同一查询下的多个区域任务只抓取一次
+  enrich        为新出现的公告抓取详情 (预算、采购方式、联系人等)，按 uuid 缓存在 zgyd/details/ 中；
+                仅在设置了 CRAWLER_DETAIL_URL 时生效
+  notify        数据变动时推送差异报告 (Server 酱，需设置 WECHAT_WEBHOOK_URL)，差异索引保存在 zgyd/<任务 ID 小写>_index.json；
+                为字符串时作为推送标题前缀 (例如 "北京开标")，为 true 时使用数据集名称
+  deadlines     维护截止时间索引 zgyd/<任务 ID 小写>_deadlines.json，每次运行推送进入 CLOSING_SOON_HOURS 窗口的截止提醒，
+                看板中显示即将截止列表；同样维护差异索引 (用于核对截止时间是否仍有效)
+  default_tab   看板默认打开的 Tab (未指定时为第一个任务)
+  cron          Cron 表达式列表 (UTC)，供 Cloudflare Worker 和 --daemon 调度；
+                新增 Cron 时还需同步 wrangler.toml 的 [triggers]
+  schedule      看板中显示的更新计划描述
+
+新增区域任务只需在 tasks.json 中添加一项，例如：
+  "TASK_SH": {"name": "所有招采_正在招标_上海", "payload": {"homePageQueryType": "Bidding", "companyType": "<区域代码>"},
+              "local_filter": {"companyTypeName": "上海"}, "cron": [...], "schedule": "..."}
+"""
+
+import json
+import os
+
+REGISTRY_PATH = os.environ.get("TASK_REGISTRY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks.json"))
+REQUIRED_FIELDS = ["name", "payload"]
+
+
+def load_task_registry(path=None):
+    """读取任务注册表 {任务 ID: 配置}，保持文件中的顺序；缺少必填字段或名称重复时抛出 ValueError。"""
+    path = path or REGISTRY_PATH
+    with open(path, 'r', encoding='utf-8') as f:
+        registry = json.load(f)
+
+    names = set()
+    for task_key, config in registry.items():
+        missing = [field for field in REQUIRED_FIELDS if field not in config]
+        if missing:
+            raise ValueError(f"任务注册表 {path} 中的 {task_key} 缺少字段: {', '.join(missing)}")
+        if config["name"] in names:
+            raise ValueError(f"任务注册表 {path} 中的数据集名称重复: {config['name']}")
+        names.add(config["name"])
+        if isinstance(config.get("cron"), str):
+            config["cron"] = [config["cron"]]
+    return registry
+
+
+def get_schedules(registry):
+    """[(Cron 表达式, [任务 ID, ...]), ...]：同一 Cron 表达式下的任务合并为一次运行，保持注册表顺序。"""
+    schedules = {}
+    for task_key, config in registry.items():
+        for cron in config.get("cron") or []:
+            schedules.setdefault(cron, []).append(task_key)
+    return list(schedules.items())
@@ -1,38 +1,39 @@
 // worker/index.js
 
+// 爬虫任务的 Cron 表与 crawler.py / app.py 共用 tasks.json 注册表 (wrangler 打包时内联 JSON)
+import TASKS from "../tasks.json";
+
 // 任务映射表：将 Cron 表达式与 {id: 文件名, input: Actions参数} 关联起来
 // Cron 表达式已精确转换为 UTC 时间
 const CRON_TO_WORKFLOW = {
     // =========================================================================
-    // 1. cleaner.yml
+    // cleaner.yml
     "0 19 * * *": { 
         id: "cleaner.yml", 
         description: "Weekly Cleanup (cleaner.yml)",
         input: {} // 清理任务无需额外参数
     },
-    // =========================================================================
-    // 2. scheduler.yml - TASK_1
-    "0 22 * * *": { 
-        id: "scheduler.yml", 
-        description: "Daily Schedule (TASK_1)",
-        input: { task_to_run: "TASK_1" } // 传入任务ID
-    },
-    // =========================================================================
-    // 3. scheduler.yml - TASK_2
-    "10 2,6,10,14,18,22 * * *": { 
-        id: "scheduler.yml", 
-        description: "4-Hourly Schedule (TASK_2)",
-        input: { task_to_run: "TASK_2" } // 传入任务ID
-    },
-    // =========================================================================
-    // 4. scheduler.yml - TASK_3
-    "15,25,35,45,55 22-23,0-15 * * *": {
-        id: "scheduler.yml", 
-        description: "High-Frequency Schedule (TASK_3)",
-        input: { task_to_run: "TASK_3" } // 传入任务ID
-    }
 };
 
+// scheduler.yml：由注册表生成，同一 Cron 表达式下的多个任务合并为一次运行 (逗号分隔)
+for (const [taskKey, config] of Object.entries(TASKS)) {
+    for (const cron of config.cron || []) {
+        const entry = CRON_TO_WORKFLOW[cron];
+        if (!entry) {
+            CRON_TO_WORKFLOW[cron] = {
+                id: "scheduler.yml",
+                description: `Schedule (${taskKey})`,
+                input: { task_to_run: taskKey } // 传入任务ID
+            };
+        } else if (entry.id === "scheduler.yml") {
+            entry.input.task_to_run += `,${taskKey}`;
+            entry.description = `Schedule (${entry.input.task_to_run})`;
+        } else {
+            console.error(`ERROR: Cron expression ${cron} of ${taskKey} is already used by ${entry.id}`);
+        }
+    }
+}
+
 
 export default {
     async scheduled(event, env, ctx) {